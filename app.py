@@ -1,5 +1,7 @@
 import streamlit as st
+from services.perfil import Cronometro
 
+cronometro = Cronometro()
 st.set_page_config(
     layout="wide",
     page_title="Gestão de Chamados",
@@ -10,10 +12,12 @@ st.set_page_config(
 
 import os
 from dotenv import load_dotenv
-import pandas as pd
-from services.supabase import supabase
+# pandas, o pacote supabase e o plotly só são importados quando alguma página precisa deles
+from services.supabase import cliente_da_sessao, sessao_tem_cliente, autenticar_com_token, encerrar_sessao
+from services.autenticacao import validar_localmente
 import time
 from streamlit_cookies_manager import EncryptedCookieManager
+cronometro.marcar("importações")
 
 # Ler a variável de ambiente PORT
 port = int(os.environ.get("PORT", 8501))
@@ -48,11 +52,12 @@ cookies = EncryptedCookieManager(
 )
 if not cookies.ready():
     st.stop()
+cronometro.marcar("cookies")
 
 # Função para autenticar o usuário
 def autenticar_usuario(email, senha):
     try:
-        response = supabase.auth.sign_in_with_password({"email": email, "password": senha})
+        response = cliente_da_sessao().auth.sign_in_with_password({"email": email, "password": senha})
         if response.user:
             # Salvar access_token e refresh_token no cookie
             cookies["access_token"] = response.session.access_token
@@ -145,10 +150,23 @@ def verificar_autenticacao():
     access_token = cookies.get("access_token")
     refresh_token = cookies.get("refresh_token")
     
-    if access_token and refresh_token and st.session_state["usuario"] is None:
+    # Também restaura se o cliente da sessão foi descartado (sessão parada por muito tempo).
+    # Sessão restaurada localmente não tem sessão no auth que renove o token: ela é
+    # conferida a cada rodada (a validação fica em cache) e renovada perto de expirar.
+    restaurar = access_token and refresh_token and (
+        st.session_state["usuario"] is None or not sessao_tem_cliente() or st.session_state.get("sessao_local")
+    )
+    # Token com assinatura válida e longe de expirar: restaura sem ida ao servidor
+    claims = validar_localmente(access_token) if restaurar else None
+    if claims:
+        autenticar_com_token(access_token)
+        st.session_state["usuario"] = claims
+        st.session_state["sessao_local"] = True
+    elif restaurar:
+        st.session_state["sessao_local"] = False
         try:
-            # Restaurar a sessão do Supabase com ambos os tokens
-            response = supabase.auth.set_session(access_token, refresh_token)
+            # Restaurar a sessão do Supabase com ambos os tokens (renova o token perto de expirar)
+            response = cliente_da_sessao().auth.set_session(access_token, refresh_token)
             if response.user:
                 st.session_state["usuario"] = response.user
                  # Atualizar os tokens no cookie
@@ -157,16 +175,20 @@ def verificar_autenticacao():
                 cookies.save()
         except Exception as e:
             st.error(f"Erro ao restaurar sessão: {str(e)}")
+            st.session_state["usuario"] = None
             cookies.pop("access_token", None)
             cookies.pop("refresh_token", None)
             cookies.save()
     
     if st.session_state["usuario"] is None:
         tela_login()
+        cronometro.exibir("login")
         st.stop()
     else:
         def logout():
             st.session_state["usuario"] = None
+            st.session_state["sessao_local"] = False
+            encerrar_sessao(cookies.get("access_token"))
             cookies.pop("access_token", None)
             cookies.pop("refresh_token", None)
             cookies.save()
@@ -354,51 +376,16 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def carregar_chamados():
-    try:
-        response = supabase.table("Chamados").select("id, chamados_sh, chamados_px, titulo, data_abertura, pendencia_retorno, usuario_resp, status, observacao").order("data_abertura", desc=False).order("id", desc=False).execute()
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df.rename(columns={
-                "id": "ID",
-                "chamados_sh": "Chamados SH",
-                "chamados_px": "Chamados Pixeon",
-                "titulo": "Título",
-                "data_abertura": "Data",
-                "pendencia_retorno": "Pendência",
-                "usuario_resp": "Usuário Resp",
-                "status": "Status",
-                "observacao": "Observação",
-            }, inplace=True)
-            df["Chamados SH"] = pd.to_numeric(df["Chamados SH"], errors='coerce').fillna(0).astype(int)
-            # df["Chamados Pixeon"] = pd.to_numeric(df["Chamados Pixeon"], errors='coerce').fillna(0).astype(int)
-            df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-            
-            df = df.sort_values(by=["Data", "ID"], ascending=[True, True])
-            df["Data"] = df["Data"].dt.strftime("%Y-%m-%d")
-            df["Data"] = pd.to_datetime(df["Data"], format="%Y-%m-%d", errors="coerce")
-            return df
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro ao carregar os chamados: {e}")
-        return pd.DataFrame()
-
-def exibir_contadores(df, df_completo):
-    if df.empty and df_completo.empty:
+def exibir_contadores(contagens):
+    # Contadores sempre mostram o total da tabela, independente dos filtros
+    if not any(contagens["Status"].values()) and not any(contagens["Pendência"].values()):
         st.warning("Nenhum dado disponível para exibir os contadores.")
         return
 
-    # Contadores baseados nos dados filtrados
-    total_abertos = df[df["Status"] == "Aberto"].shape[0]
-    total_pend_px = df[df["Pendência"] == "Pixeon"].shape[0]
-    total_pend_sh = df[df["Pendência"] == "SH"].shape[0]
-    
-    # Contador de concluídos sempre mostra o total, independente dos filtros
-    total_concluidos = df_completo[df_completo["Status"] == "Concluído"].shape[0]
-    total_abertos = df_completo[df_completo["Status"] == "Aberto"].shape[0]
-    total_pend_px = df_completo[df_completo["Pendência"] == "Pixeon"].shape[0]
-    total_pend_sh = df_completo[df_completo["Pendência"] == "SH"].shape[0]
+    total_abertos = contagens["Status"].get("Aberto", 0)
+    total_concluidos = contagens["Status"].get("Concluído", 0)
+    total_pend_px = contagens["Pendência"].get("Pixeon", 0)
+    total_pend_sh = contagens["Pendência"].get("SH", 0)
 
     st.markdown("""
     <style>
@@ -472,35 +459,62 @@ def main():
     st.sidebar.header("Navegação", divider="blue")
     pagina = st.sidebar.radio("Escolha uma página:", ["Chamados Pixeon","Chamados Fácil","Dashboard"])
     
+    cronometro.marcar("autenticação")
+
     if pagina == "Chamados Pixeon":
-        # Carregar dados completos (não filtrados)
-        df_completo = carregar_chamados()
-        
+        with cronometro.medir("importação da página"):
+            from services.chamados import (
+                obter_chamados_versao, idade_snapshot, colunas_banco, visao_filtrada, contagens_tabela, inserir_chamado,
+                salvar_alteracoes, PUSHDOWN_PADRAO, PAGINAR_PADRAO, contar_servidor, contagens_servidor, consultar_pagina,
+                tudo_ou_nada_disponivel,
+            )
+            from services.editor import (
+                montar_alteracoes, controles_paginacao, fatiar_pagina, chave_editor, visao_do_editor, descartar_edicoes,
+            )
+            from services.cache import versao_tabela
+
         # Filtros na sidebar
         st.sidebar.header("Filtros e Pesquisa", divider="blue")
         selected_status = st.sidebar.selectbox("Filtrar por Status", ["Todos", "Aberto", "Concluído"],index=1) # Define "Aberto" como o valor padrão 
         selected_pendencia = st.sidebar.selectbox("Filtrar por Pendência", ["Todos", "Pixeon", "SH"])
         search_term = st.sidebar.text_input("Pesquisar por Número, Título ou Responsável", placeholder="Digite o termo de pesquisa")
-        
-        # Aplicar filtros (cria uma cópia filtrada)
-        df_filtrado = df_completo.copy()
-        if selected_status != "Todos":
-            df_filtrado = df_filtrado[df_filtrado["Status"] == selected_status]
-        if selected_pendencia != "Todos":
-            df_filtrado = df_filtrado[df_filtrado["Pendência"] == selected_pendencia]
-        if search_term:
-            search_term = str(search_term).lower()
-            df_filtrado = df_filtrado[
-                df_filtrado["Chamados SH"].astype(str).str.lower().str.contains(search_term) |
-                df_filtrado["Chamados Pixeon"].astype(str).str.lower().str.contains(search_term) |
-                df_filtrado["Título"].str.lower().str.contains(search_term) |
-                df_filtrado["Usuário Resp"].str.lower().str.contains(search_term) |
-                df_filtrado["Observação"].str.lower().str.contains(search_term)
-            ]
-
-        # Exibir contadores (passando ambos os DataFrames)
+        consulta_servidor = st.sidebar.checkbox("Consultar no servidor", value=PUSHDOWN_PADRAO, key="pushdown",
+                                                help="Filtra e pesquisa no banco e busca só a página exibida.")
+        filtros = (selected_status, selected_pendencia, search_term)
+
+        if consulta_servidor:
+            # Filtros no PostgREST: só a página exibida é baixada e os contadores vêm de contagens no banco
+            total = contar_servidor("Chamados", selected_status, selected_pendencia, search_term)
+            inicio_pagina, tamanho_pagina = controles_paginacao(total, "pagina_chamados")
+            df_filtrado = consultar_pagina("Chamados", selected_status, selected_pendencia, search_term, inicio_pagina, tamanho_pagina)
+            contagens = contagens_servidor("Chamados", versao_tabela("Chamados"))
+            editor = chave_editor("data_editor", inicio_pagina, tamanho_pagina, filtros)
+        else:
+            # Carregar dados completos (não filtrados)
+            df_completo, versao = obter_chamados_versao("Chamados")
+
+            # Aplicar filtros (a pesquisa é sem acentos e sem diferenciar maiúsculas).
+            # A visão filtrada e numerada é memorizada por versão do snapshot e compartilhada entre sessões.
+            df_filtrado = visao_filtrada("Chamados", df_completo, versao, selected_status, selected_pendencia, search_term)
+            contagens = contagens_tabela("Chamados")
+
+            # Paginação local: o filtro continua sobre o snapshot inteiro, mas só a página vai para o editor
+            editor = chave_editor("data_editor", filtros=filtros)
+            if st.sidebar.checkbox("Paginar a lista", value=PAGINAR_PADRAO, key="paginar",
+                                   help="Envia ao navegador só a página exibida do editor."):
+                inicio_pagina, tamanho_pagina = controles_paginacao(len(df_filtrado), "pagina_chamados")
+                df_filtrado = fatiar_pagina(df_filtrado, inicio_pagina, tamanho_pagina)
+                editor = chave_editor("data_editor", inicio_pagina, tamanho_pagina, filtros)
+
+        # Com edições pendentes o editor continua sobre as linhas em que elas foram feitas
+        df_filtrado = visao_do_editor(editor, df_filtrado)
+
+        # Exibir contadores
         st.header("Resumo dos Chamados Pixeon",divider="blue")
-        exibir_contadores(df_filtrado, df_completo)
+        idade = None if consulta_servidor else idade_snapshot("Chamados")
+        if idade is not None:
+            st.caption(f"🔄 Dados atualizados há {idade:.0f} s")
+        exibir_contadores(contagens)
 
         # FORMULÁRIO DE INSERÇÃO DE NOVOS CHAMADOS (ADICIONADO AQUI)
         with st.expander("➕ Inserir Novo Chamado", expanded=False):
@@ -537,10 +551,8 @@ def main():
                         }
                         
                         try:
-                            response = supabase.table("Chamados").insert(novo_chamado).execute()
-                            if response.data:
+                            if inserir_chamado("Chamados", novo_chamado):
                                 st.success("Chamado cadastrado com sucesso!")
-                                st.cache_data.clear()
                                 #time.sleep(1)
                                 #st.rerun()
                             else:
@@ -552,17 +564,13 @@ def main():
         st.write("### Lista de Chamados")
         
         if not df_filtrado.empty:
-            # Garantir ordenação por Data e ID
-            df_filtrado = df_filtrado.sort_values(by=["Data", "ID"], ascending=[True, True])
-
-            # Adicionar uma coluna de contador
-            df_filtrado = df_filtrado.reset_index(drop=True)  # Redefinir o índice do DataFrame
-            df_filtrado["Nº"] = df_filtrado.index + 1  # Criar a coluna de contador (1, 2, 3, ...)
-
+            # df_filtrado já vem ordenado por Data e ID, com índice posicional e a coluna "Nº"
             # Reorganizar as colunas para exibição no editor
             colunas_exibidas = ["Nº", "Chamados SH", "Chamados Pixeon", "Título", "Data", 
                                 "Pendência", "Usuário Resp", "Status", "Observação"]
             df_exibido = df_filtrado[colunas_exibidas]  # Criar um DataFrame apenas com as colunas visíveis
+            # Responsável é texto livre no editor (a categoria do snapshot não aceitaria nomes novos)
+            df_exibido = df_exibido.astype({"Usuário Resp": object})
 
             # Configuração das colunas para edição
             column_config = {
@@ -586,53 +594,38 @@ def main():
             altura_calculada = min(max(len(df_exibido) * altura_por_linha, altura_minima), altura_maxima)
 
             # Editor de dados com altura automática
-            edited_df = st.data_editor(
+            st.data_editor(
                 df_exibido,
                 column_config=column_config,
                 use_container_width=True,
                 hide_index=True,
                 num_rows="fixed",
-                key="data_editor",
+                key=editor,
                 height=altura_calculada
             )
 
+            # Com "tudo ou nada" as alterações vão numa única transação (se o backend oferecer)
+            tudo_ou_nada = tudo_ou_nada_disponivel() and st.checkbox(
+                "Salvar tudo ou nada", key="tudo_ou_nada", help="Se alguma alteração falhar, nenhuma é gravada.")
+
             # Botão para salvar alterações
             if st.button("💾 Salvar Alterações"):
                 try:
-                    changes = []
-                    for index, row in edited_df.iterrows():
-                        # Recuperar o ID correspondente ao índice
-                        original_row = df_filtrado.loc[index]
-                        if not row.equals(original_row):
-                            # Tratar valores nulos na coluna "Data"
-                            data_abertura = row["Data"]
-                            if pd.isnull(data_abertura):  # Verificar se a data é nula
-                                data_abertura = None  # Substituir por None
-                            else:
-                                data_abertura = data_abertura.strftime("%Y-%m-%d")  # Formatar a data
-
-                            changes.append({
-                                "id": original_row["ID"],  # Usar o ID original para identificar o registro
-                                "data": {
-                                    "chamados_sh": row["Chamados SH"],
-                                    "chamados_px": row["Chamados Pixeon"],
-                                    "titulo": row["Título"],
-                                    "data_abertura": data_abertura,  # Data tratada
-                                    "pendencia_retorno": row["Pendência"],
-                                    "usuario_resp": row["Usuário Resp"],
-                                    "status": row["Status"],
-                                    "observacao": row["Observação"]
-                                }
-                            })
+                    # Só as células editadas (o editor guarda o delta no session_state)
+                    edited_rows = st.session_state.get(editor, {}).get("edited_rows", {})
+                    changes = montar_alteracoes(edited_rows, df_filtrado, colunas_banco("Chamados"), completar=True)
 
                     if changes:
-                        for change in changes:
-                            supabase.table("Chamados").update(change["data"]).eq("id", change["id"]).execute()
-
-                        st.success(f"{len(changes)} alteração(ões) salva(s) com sucesso!")
-                        st.cache_data.clear()
-                        time.sleep(1)
-                        st.rerun()
+                        salvos, erros = salvar_alteracoes("Chamados", changes, tudo_ou_nada=tudo_ou_nada)
+
+                        for id_chamado, erro in erros:
+                            st.error(f"Erro ao salvar o chamado {id_chamado}: {erro}")
+                        if salvos:
+                            st.success(f"{len(salvos)} alteração(ões) salva(s) com sucesso!")
+                        if not erros:
+                            descartar_edicoes(editor)
+                            time.sleep(1)
+                            st.rerun()
                     else:
                         st.info("Nenhuma alteração detectada para salvar.")
                 except Exception as e:
@@ -640,13 +633,17 @@ def main():
         else:
             st.warning("Nenhum chamado encontrado com os filtros atuais.")
     elif pagina == "Chamados Fácil":
-        from facil import pagina_facil
+        with cronometro.medir("importação da página"):
+            from facil import pagina_facil
         pagina_facil()
     
     elif pagina == "Dashboard":
-        from streamlit_dashboard_extra import dashboard
+        with cronometro.medir("importação da página"):
+            from streamlit_dashboard_extra import dashboard
         dashboard()
 
+    cronometro.exibir(pagina)
+
 
 if __name__ == "__main__":
     main()
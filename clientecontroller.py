@@ -1,63 +1,86 @@
-from typing import List
-import services.supabase as db;
-import models.Cliente as cliente;
+from itertools import islice
+from services.armazenamento import obter_backend
+import models.Cliente as cliente
 
-def Incluir(cliente):
-    try:
-        # Consulta SQL
-        query = """
-            INSERT INTO Chamados (
-                chamados_sh, 
-                chamados_px, 
-                titulo, 
-                data_abertura, 
-                pendencia_retorno, 
-                usuario_resp, 
-                status, 
-                observacao
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        
-        # Parâmetros da consulta
-        params = (
-            str(cliente.chsh), 
-            str(cliente.chpx), 
-            str(cliente.titulo), 
-            cliente.data.strftime('%Y-%m-%d %H:%M:%S'),  # Converte data para string
-            str(cliente.pend),  # Converte bool para int (0 ou 1)
-            str(cliente.usr), 
-            str(cliente.status), 
-            str(cliente.obs)
-        )
+# Linhas por lote na leitura (fetchmany) e na inclusão em massa (executemany)
+TAMANHO_LOTE = 1000
+
+# Atributos do Cliente -> colunas do banco, por tabela
+COLUNAS = {
+    "Chamados": {
+        "chsh": "chamados_sh",
+        "chpx": "chamados_px",
+        "titulo": "titulo",
+        "data": "data_abertura",
+        "pend": "pendencia_retorno",
+        "usr": "usuario_resp",
+        "status": "status",
+        "obs": "observacao",
+    },
+    "Chamados_fc": {
+        "chsh": "chamado_sd",
+        "chpx": "chamado_facil",
+        "titulo": "titulo",
+        "data": "data_abertura",
+        "pend": "pendencia_retorno",
+        "usr": "usuario_resp",
+        "status": "status",
+        "obs": "observacao",
+    },
+}
+
+def _registro(cliente, tabela):
+    """Cliente -> dict com as colunas do banco (sem o id, gerado pelo banco)"""
+    dados = cliente.to_dict()
+    return {coluna: dados[atributo] for atributo, coluna in COLUNAS[tabela].items()}
 
-        # Executa a consulta
-        db.cursor.execute(query, params)
-        
-        # Confirma a transação
-        db.cnxn.commit()
-        
+def Incluir(cliente, tabela=None):
+    tabela = tabela or cliente.tabela or "Chamados"
+    try:
+        registros = obter_backend().inserir(tabela, _registro(cliente, tabela))
+        if registros:
+            cliente.id = registros[0].get("id")
         print("Chamado inserido com sucesso!")
     except Exception as e:
         print("Erro ao inserir chamado:", e)
 
-def selecionarchamados():
-    # Executa a consulta SQL
-    db.cursor.execute("SELECT * FROM Chamados")
-    rows = db.cursor.fetchall()
-    
-    # Cria uma lista de objetos Cliente
-    constumerList = []
-    for row in rows:
-        constumerList.append(cliente.Cliente(
-            id=row[0],  # ID
-            chsh=row[1],  # Chamado Fácil
-            chpx=row[2],  # Chamado Nordeste
-            titulo=row[3],  # Título
-            data=row[4],  # Data
-            pend=row[5],  # Pendência
-            usr=row[6],  # Usuário responsável
-            status=row[7],  # Status
-            obs=row[8]  # Observação
-        ))
-    
-    return constumerList
+def IncluirLote(clientes, tabela="Chamados", tamanho_lote=TAMANHO_LOTE):
+    """
+    Insere muitos chamados de uma vez: um executemany (ou um POST, no Supabase) e
+    um commit por lote. `clientes` pode ser um gerador; só um lote fica em memória.
+    Devolve a quantidade inserida; um lote recusado interrompe a importação.
+    """
+    total = 0
+    clientes = iter(clientes)
+    while True:
+        lote = [_registro(c, tabela) for c in islice(clientes, tamanho_lote)]
+        if not lote:
+            break
+        try:
+            total += obter_backend().inserir_em_lote(tabela, lote)
+        except Exception as e:
+            print(f"Erro ao inserir chamados (lote após {total} inseridos):", e)
+            break
+    print(f"{total} chamado(s) inserido(s) com sucesso!")
+    return total
+
+def selecionarchamados(tabela="Chamados", tamanho_lote=TAMANHO_LOTE, como_dataframe=False):
+    """
+    Gera os chamados da tabela lendo em lotes de `tamanho_lote` linhas (fetchmany
+    no SQLite, uma janela por requisição no Supabase), em memória limitada.
+    Com `como_dataframe`, gera um DataFrame por lote, com os nomes dos atributos
+    do Cliente como colunas, em vez de objetos Cliente.
+    """
+    colunas = COLUNAS[tabela]
+    for registros in obter_backend().iterar(tabela, ", ".join(["id", *colunas.values()]), tamanho_lote):
+        if como_dataframe:
+            import pandas as pd
+            renomear = {coluna: atributo for atributo, coluna in colunas.items()}
+            yield pd.DataFrame.from_records(registros).rename(columns=renomear)
+            continue
+        for row in registros:
+            yield cliente.Cliente(
+                id=row["id"],
+                tabela=tabela,
+                **{atributo: row[coluna] for atributo, coluna in colunas.items()},
+            )
@@ -1,57 +1,26 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-import pandas as pd
-from services.supabase import supabase
+from services.chamados import (
+    obter_chamados_versao, idade_snapshot, colunas_banco, visao_filtrada, contagens_tabela, inserir_chamado, salvar_alteracoes,
+    PUSHDOWN_PADRAO, PAGINAR_PADRAO, contar_servidor, contagens_servidor, consultar_pagina, tudo_ou_nada_disponivel,
+)
+from services.editor import (
+    montar_alteracoes, controles_paginacao, fatiar_pagina, chave_editor, visao_do_editor, descartar_edicoes,
+)
+from services.cache import versao_tabela
 import time
 from streamlit_cookies_manager import EncryptedCookieManager
 
-@st.cache_data(ttl=300)
-def carregar_chamados_fc():
-    try:
-        response = supabase.table("Chamados_fc").select(
-            "id, chamado_sd, chamado_facil, titulo, data_abertura, pendencia_retorno, usuario_resp, status, observacao"
-        ).order("data_abertura", desc=False).order("id", desc=False).execute()
-        
-        # # Logs de depuração
-        # st.write("Resposta bruta do Supabase:", response.data)
-        # st.write("Tamanho da resposta:", len(response.data) if response.data else 0)
-        
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df.rename(columns={
-                "id": "ID",
-                "chamado_sd": "Chamados SH",
-                "chamado_facil": "Chamados Fácil",
-                "titulo": "Título",
-                "data_abertura": "Data",
-                "pendencia_retorno": "Pendência",
-                "usuario_resp": "Usuário Resp",
-                "status": "Status",
-                "observacao": "Observação",
-            }, inplace=True)
-            df["Chamados SH"] = pd.to_numeric(df["Chamados SH"], errors='coerce').fillna(0).astype(int)
-            df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-            df = df.sort_values(by=["Data", "ID"], ascending=[True, True])
-            df["Data"] = df["Data"].dt.strftime("%Y-%m-%d")
-            df["Data"] = pd.to_datetime(df["Data"], format="%Y-%m-%d", errors="coerce")
-            return df
-        else:
-            st.warning("Nenhum dado retornado pelo Supabase para a tabela 'Chamados_fc'.")
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro ao carregar os chamados: {str(e)}")
-        return pd.DataFrame()
-
-def exibir_contadores(df, df_completo_fc):
-    if df.empty and df_completo_fc.empty:
+def exibir_contadores(contagens):
+    if not any(contagens["Status"].values()) and not any(contagens["Pendência"].values()):
         st.warning("Nenhum dado disponível para exibir os contadores.")
         return
 
-    total_abertos = df_completo_fc[df_completo_fc["Status"] == "Aberto"].shape[0]
-    total_concluidos = df_completo_fc[df_completo_fc["Status"] == "Concluído"].shape[0]
-    total_pend_sh = df_completo_fc[df_completo_fc["Pendência"] == "Nordeste"].shape[0]
-    total_pend_fc = df_completo_fc[df_completo_fc["Pendência"] == "Fácil"].shape[0]
+    total_abertos = contagens["Status"].get("Aberto", 0)
+    total_concluidos = contagens["Status"].get("Concluído", 0)
+    total_pend_sh = contagens["Pendência"].get("Nordeste", 0)
+    total_pend_fc = contagens["Pendência"].get("Fácil", 0)
 
     st.markdown("""
     <style>
@@ -73,40 +42,47 @@ def exibir_contadores(df, df_completo_fc):
     """, unsafe_allow_html=True)
 
 def pagina_facil():
-    df_completo_fc = carregar_chamados_fc()
-    if df_completo_fc.empty:
-        st.warning("Nenhum dado foi carregado da tabela Chamados_fc. Você pode adicionar novos chamados abaixo.")
-
     st.sidebar.header("Filtros e Pesquisa", divider="blue")
     selected_status = st.sidebar.selectbox("Filtrar por Status", ["Todos", "Aberto", "Concluído"], index=1)
     selected_pendencia = st.sidebar.selectbox("Filtrar por Pendência", ["Todos", "Fácil", "Nordeste"])
     search_term = st.sidebar.text_input("Pesquisar por Número, Título ou Responsável", placeholder="Digite o termo de pesquisa")  # Ajustado para "search_term"
-
-    df_filtrado_fc = df_completo_fc.copy()
-    if not df_filtrado_fc.empty:
-        if selected_status != "Todos":
-            df_filtrado_fc = df_filtrado_fc[df_filtrado_fc["Status"] == selected_status]
-        if selected_pendencia != "Todos":
-            df_filtrado_fc = df_filtrado_fc[df_filtrado_fc["Pendência"] == selected_pendencia]
-        if search_term:
-            search_term = str(search_term).lower()
-            # # Log de depuração
-            # st.write("Colunas disponíveis em df_filtrado_fc:", df_filtrado_fc.columns.tolist())
-            # st.write("Primeiras 5 linhas antes do filtro de pesquisa:", df_filtrado_fc.head())
-            try:
-                df_filtrado_fc = df_filtrado_fc[
-                    df_filtrado_fc["Chamados SH"].astype(str).str.lower().str.contains(search_term, na=False) |
-                    df_filtrado_fc["Chamados Fácil"].astype(str).str.lower().str.contains(search_term, na=False) |
-                    df_filtrado_fc["Título"].str.lower().str.contains(search_term, na=False) |
-                    df_filtrado_fc["Usuário Resp"].str.lower().str.contains(search_term, na=False) |
-                    df_filtrado_fc["Observação"].str.lower().str.contains(search_term, na=False)
-                ]
-                # st.write("Primeiras 5 linhas após o filtro de pesquisa:", df_filtrado_fc.head())
-            except Exception as e:
-                st.error(f"Erro ao aplicar filtro de pesquisa: {str(e)}")
+    consulta_servidor = st.sidebar.checkbox("Consultar no servidor", value=PUSHDOWN_PADRAO, key="pushdown_fc",
+                                            help="Filtra e pesquisa no banco e busca só a página exibida.")
+    filtros = (selected_status, selected_pendencia, search_term)
+
+    if consulta_servidor:
+        total = contar_servidor("Chamados_fc", selected_status, selected_pendencia, search_term)
+        inicio_pagina, tamanho_pagina = controles_paginacao(total, "pagina_chamados_fc")
+        df_filtrado_fc = consultar_pagina("Chamados_fc", selected_status, selected_pendencia, search_term, inicio_pagina, tamanho_pagina)
+        contagens = contagens_servidor("Chamados_fc", versao_tabela("Chamados_fc"))
+        editor = chave_editor("data_editor_fc", inicio_pagina, tamanho_pagina, filtros)
+    else:
+        df_completo_fc, versao = obter_chamados_versao("Chamados_fc")
+        if df_completo_fc.empty:
+            st.warning("Nenhum dado foi carregado da tabela Chamados_fc. Você pode adicionar novos chamados abaixo.")
+
+        df_filtrado_fc = df_completo_fc
+        try:
+            df_filtrado_fc = visao_filtrada("Chamados_fc", df_completo_fc, versao, selected_status, selected_pendencia, search_term)
+        except Exception as e:
+            st.error(f"Erro ao aplicar filtro de pesquisa: {str(e)}")
+        contagens = contagens_tabela("Chamados_fc")
+
+        editor = chave_editor("data_editor_fc", filtros=filtros)
+        if st.sidebar.checkbox("Paginar a lista", value=PAGINAR_PADRAO, key="paginar_fc",
+                               help="Envia ao navegador só a página exibida do editor."):
+            inicio_pagina, tamanho_pagina = controles_paginacao(len(df_filtrado_fc), "pagina_chamados_fc")
+            df_filtrado_fc = fatiar_pagina(df_filtrado_fc, inicio_pagina, tamanho_pagina)
+            editor = chave_editor("data_editor_fc", inicio_pagina, tamanho_pagina, filtros)
+
+    # Com edições pendentes o editor continua sobre as linhas em que elas foram feitas
+    df_filtrado_fc = visao_do_editor(editor, df_filtrado_fc)
 
     st.header("Resumo dos Chamados Fácil", divider="blue")
-    exibir_contadores(df_filtrado_fc, df_completo_fc)
+    idade = None if consulta_servidor else idade_snapshot("Chamados_fc")
+    if idade is not None:
+        st.caption(f"🔄 Dados atualizados há {idade:.0f} s")
+    exibir_contadores(contagens)
 
     with st.expander("➕ Inserir Novo Chamado", expanded=False):
         with st.form(key="add_chamado_fc", clear_on_submit=True):
@@ -138,10 +114,8 @@ def pagina_facil():
                         "observacao": observacao if observacao else None
                     }
                     try:
-                        response = supabase.table("Chamados_fc").insert(novo_chamado).execute()
-                        if response.data:
+                        if inserir_chamado("Chamados_fc", novo_chamado):
                             st.success("Chamado cadastrado com sucesso!")
-                            st.cache_data.clear()
                             time.sleep(1)
                             st.rerun()
                         else:
@@ -151,11 +125,8 @@ def pagina_facil():
 
     if not df_filtrado_fc.empty:
         st.write("### Lista de Chamados")
-        df_filtrado_fc = df_filtrado_fc.sort_values(by=["Data", "ID"], ascending=[True, True])
-        df_filtrado_fc = df_filtrado_fc.reset_index(drop=True)
-        df_filtrado_fc["Nº"] = df_filtrado_fc.index + 1
         colunas_exibidas = ["Nº", "Chamados SH", "Chamados Fácil", "Título", "Data", "Pendência", "Usuário Resp", "Status", "Observação"]
-        df_exibido = df_filtrado_fc[colunas_exibidas]
+        df_exibido = df_filtrado_fc[colunas_exibidas].astype({"Usuário Resp": object})
 
         column_config = {
             "Nº": st.column_config.NumberColumn("Nº", width=None, disabled=True),
@@ -170,43 +141,29 @@ def pagina_facil():
         }
 
         altura_calculada = min(max(len(df_exibido) * 35, 600), 1000)
-        edited_df = st.data_editor(
+        st.data_editor(
             df_exibido, column_config=column_config, use_container_width=True, hide_index=True,
-            num_rows="fixed", key="data_editor_fc", height=altura_calculada
+            num_rows="fixed", key=editor, height=altura_calculada
         )
 
+        tudo_ou_nada = tudo_ou_nada_disponivel() and st.checkbox(
+            "Salvar tudo ou nada", key="tudo_ou_nada_fc", help="Se alguma alteração falhar, nenhuma é gravada.")
+
         if st.button("💾 Salvar Alterações"):
             try:
-                changes = []
-                for index, row in edited_df.iterrows():
-                    original_row = df_filtrado_fc.loc[index]
-                    if not row.equals(original_row):
-                        data_abertura = row["Data"]
-                        if pd.isnull(data_abertura):
-                            data_abertura = None
-                        else:
-                            data_abertura = data_abertura.strftime("%Y-%m-%d")
-                        changes.append({
-                            "id": original_row["ID"],
-                            "data": {
-                                "chamado_sd": row["Chamados SH"],
-                                "chamado_facil": row["Chamados Fácil"],
-                                "titulo": row["Título"],
-                                "data_abertura": data_abertura,
-                                "pendencia_retorno": row["Pendência"],
-                                "usuario_resp": row["Usuário Resp"],
-                                "status": row["Status"],
-                                "observacao": row["Observação"]
-                            }
-                        })
+                edited_rows = st.session_state.get(editor, {}).get("edited_rows", {})
+                changes = montar_alteracoes(edited_rows, df_filtrado_fc, colunas_banco("Chamados_fc"), completar=True)
 
                 if changes:
-                    for change in changes:
-                        supabase.table("Chamados_fc").update(change["data"]).eq("id", change["id"]).execute()
-                    st.success(f"{len(changes)} alteração(ões) salva(s) com sucesso!")
-                    st.cache_data.clear()
-                    time.sleep(1)
-                    st.rerun()
+                    salvos, erros = salvar_alteracoes("Chamados_fc", changes, tudo_ou_nada=tudo_ou_nada)
+                    for id_chamado, erro in erros:
+                        st.error(f"Erro ao salvar o chamado {id_chamado}: {erro}")
+                    if salvos:
+                        st.success(f"{len(salvos)} alteração(ões) salva(s) com sucesso!")
+                    if not erros:
+                        descartar_edicoes(editor)
+                        time.sleep(1)
+                        st.rerun()
                 else:
                     st.info("Nenhuma alteração detectada para salvar.")
             except Exception as e:
@@ -0,0 +1,291 @@
+from datetime import datetime
+
+# Status aceitos num chamado
+STATUS = ("Aberto", "Concluído")
+# Atributos de um chamado, na ordem do construtor
+CAMPOS = ("id", "chsh", "chpx", "titulo", "data", "pend", "usr", "status", "obs", "tabela")
+
+def _converter_data(data):
+    # fromisoformat é bem mais rápido que strptime; o formato é conferido antes
+    # porque ele aceita variações (ex.: semana ISO) que o strptime recusa
+    if len(data) == 10 and data[4] == "-" and data[7] == "-":
+        try:
+            return datetime.fromisoformat(data)
+        except ValueError:
+            pass
+    return datetime.strptime(data, "%Y-%m-%d")
+
+class Cliente:
+    # Sem __dict__ por instância: bem menos memória com dezenas de milhares de chamados
+    __slots__ = CAMPOS
+
+    def __init__(self, id, chsh, chpx, titulo, data, pend, usr, status, obs, tabela=None):
+        """
+        Classe para representar um cliente ou chamado.
+
+        Args:
+            id (int): ID do chamado.
+            chsh (int): Número do chamado SH.
+            chpx (str): Número do chamado PX ou Fácil.
+            titulo (str): Título do chamado.
+            data (str ou datetime): Data de abertura do chamado.
+            pend (str): Pendência (ex.: "SH", "Fácil").
+            usr (str): Usuário responsável.
+            status (str): Status do chamado (ex.: "Aberto", "Concluído").
+            obs (str): Observação do chamado.
+            tabela (str, opcional): Nome da tabela de origem (ex.: "Chamados", "Chamados_fc").
+        """
+        if status not in STATUS:
+            raise ValueError("O status deve ser 'Aberto' ou 'Concluído'.")
+        
+        try:
+            self.data = _converter_data(data) if isinstance(data, str) else data
+        except ValueError:
+            raise ValueError("A data deve estar no formato 'YYYY-MM-DD'.")
+
+        self.id = id
+        self.chsh = chsh
+        self.chpx = chpx
+        self.titulo = titulo
+        self.pend = pend
+        self.usr = usr
+        self.status = status
+        self.obs = obs
+        self.tabela = tabela  # Indica a origem dos dados (opcional)
+
+    def to_dict(self):
+        """
+        Converte o objeto Cliente em um dicionário.
+
+        Returns:
+            dict: Representação do objeto como dicionário.
+        """
+        return {
+            "id": self.id,
+            "chsh": self.chsh,
+            "chpx": self.chpx,
+            "titulo": self.titulo,
+            "data": self.data.strftime("%Y-%m-%d") if isinstance(self.data, datetime) else self.data,
+            "pend": self.pend,
+            "usr": self.usr,
+            "status": self.status,
+            "obs": self.obs,
+            "tabela": self.tabela,
+        }
+
+    @classmethod
+    def _sem_validacao(cls, id, chsh, chpx, titulo, data, pend, usr, status, obs, tabela):
+        """Cria o objeto com valores já validados (ex.: vindos de um ClienteBatch)"""
+        cliente = cls.__new__(cls)
+        cliente.id = id
+        cliente.chsh = chsh
+        cliente.chpx = chpx
+        cliente.titulo = titulo
+        cliente.data = data
+        cliente.pend = pend
+        cliente.usr = usr
+        cliente.status = status
+        cliente.obs = obs
+        cliente.tabela = tabela
+        return cliente
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Cria um objeto Cliente a partir de um dicionário.
+
+        Args:
+            data (dict): Dicionário contendo os dados do cliente.
+
+        Returns:
+            Cliente: Objeto Cliente criado a partir do dicionário.
+        """
+        return cls(
+            id=data.get("id"),
+            chsh=data.get("chsh"),
+            chpx=data.get("chpx"),
+            titulo=data.get("titulo"),
+            data=data.get("data"),
+            pend=data.get("pend"),
+            usr=data.get("usr"),
+            status=data.get("status"),
+            obs=data.get("obs"),
+            tabela=data.get("tabela"),
+        )
+
+    def atualizar(self, **kwargs):
+        """
+        Atualiza os atributos do objeto Cliente com base nos argumentos fornecidos.
+
+        Args:
+            **kwargs: Atributos a serem atualizados.
+        """
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    def __repr__(self):
+        """
+        Representação legível do objeto Cliente.
+
+        Returns:
+            str: Representação do objeto.
+        """
+        return (
+            f"Cliente(id={self.id}, chsh={self.chsh}, chpx={self.chpx}, titulo={self.titulo}, "
+            f"data={self.data}, pend={self.pend}, usr={self.usr}, status={self.status}, obs={self.obs}, tabela={self.tabela})"
+        )
+
+class ClienteBatch:
+    """
+    Muitos chamados em colunas (um DataFrame com os atributos do Cliente), para
+    importar e exportar em massa sem um objeto por linha.
+
+    Status e datas são validados e convertidos de uma vez para a coluna inteira.
+    Os DataFrames gerados por selecionarchamados(como_dataframe=True) já estão
+    no formato esperado.
+    """
+
+    __slots__ = ("df",)
+
+    # Colunas com poucos valores distintos viram category (um código por linha)
+    CATEGORIAS = ("pend", "usr", "status", "tabela")
+
+    def __init__(self, df, tabela=None):
+        """
+        Args:
+            df (pd.DataFrame): Colunas com os nomes dos atributos do Cliente
+                (as que faltarem ficam vazias).
+            tabela (str, opcional): Tabela de origem, se o df não tiver a coluna.
+
+        Raises:
+            ValueError: Se algum status for inválido ou alguma data não estiver no
+                formato 'YYYY-MM-DD'.
+        """
+        import pandas as pd
+        df = df.reindex(columns=list(CAMPOS))
+        if tabela is not None:
+            df["tabela"] = df["tabela"].fillna(tabela)
+
+        invalidos = ~df["status"].isin(STATUS)
+        if invalidos.any():
+            raise ValueError(
+                f"O status deve ser 'Aberto' ou 'Concluído' ({int(invalidos.sum())} linha(s) inválida(s), "
+                f"ex.: id {df.loc[invalidos, 'id'].iloc[0]})."
+            )
+
+        datas = pd.to_datetime(df["data"], format="%Y-%m-%d", errors="coerce")
+        invalidas = datas.isna() & df["data"].notna()
+        if invalidas.any():
+            raise ValueError(
+                f"A data deve estar no formato 'YYYY-MM-DD' ({int(invalidas.sum())} linha(s) inválida(s), "
+                f"ex.: id {df.loc[invalidas, 'id'].iloc[0]})."
+            )
+        df["data"] = datas
+        for coluna in ("id", "chsh"):
+            # Inteiros com ausentes continuam inteiros (sem virar float)
+            try:
+                df[coluna] = df[coluna].astype("Int64")
+            except (TypeError, ValueError):
+                pass
+        for coluna in self.CATEGORIAS:
+            df[coluna] = df[coluna].astype("category")
+        self.df = df.reset_index(drop=True)
+
+    @classmethod
+    def from_dataframe(cls, df, tabela=None):
+        return cls(df, tabela)
+
+    @classmethod
+    def from_dicts(cls, registros, tabela=None):
+        """Lista de dicts no formato de Cliente.to_dict"""
+        import pandas as pd
+        return cls(pd.DataFrame.from_records(registros, columns=list(CAMPOS)), tabela)
+
+    @classmethod
+    def from_clientes(cls, clientes):
+        """Lista de objetos Cliente (já validados um a um)"""
+        import pandas as pd
+        clientes = list(clientes)
+        return cls(pd.DataFrame({campo: [getattr(c, campo) for c in clientes] for campo in CAMPOS}))
+
+    def to_dataframe(self):
+        return self.df.copy()
+
+    def _listas(self, data):
+        # Uma lista Python por coluna (ausentes como None); as linhas saem de um zip
+        listas = []
+        for campo in CAMPOS:
+            serie = data if campo == "data" else self.df[campo]
+            listas.append(serie.astype(object).where(serie.notna(), None).tolist())
+        return zip(*listas)
+
+    def to_dicts(self):
+        """Lista de dicts no formato de Cliente.to_dict (datas como 'YYYY-MM-DD')"""
+        linhas = self._listas(self.df["data"].dt.strftime("%Y-%m-%d"))
+        return [dict(zip(CAMPOS, linha)) for linha in linhas]
+
+    def to_clientes(self):
+        """Objetos Cliente, sem repetir a validação feita para o lote"""
+        import pandas as pd
+        datas = pd.Series(self.df["data"].dt.to_pydatetime(), dtype=object)
+        return [Cliente._sem_validacao(*linha) for linha in self._listas(datas)]
+
+    def memoria(self):
+        """Bytes ocupados pelas colunas (incluindo os textos)"""
+        return int(self.df.memory_usage(deep=True, index=False).sum())
+
+    def __len__(self):
+        return len(self.df)
+
+    def __iter__(self):
+        return iter(self.to_clientes())
+
+    def __repr__(self):
+        return f"ClienteBatch({len(self)} chamado(s))"
+
+if __name__ == "__main__":
+    # Micro-benchmark: python -m models.Cliente [quantidade]
+    import sys
+    import time
+    import tracemalloc
+
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    registros = [
+        {"id": i, "chsh": i, "chpx": f"PX{i}", "titulo": f"Chamado {i}", "data": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+         "pend": ("SH", "Pixeon", "Cliente")[i % 3], "usr": f"usuario{i % 20}", "status": STATUS[i % 2], "obs": "",
+         "tabela": "Chamados"}
+        for i in range(quantidade)
+    ]
+
+    class ClienteSemSlots:
+        # Mesmo construtor, com __dict__ por instância (como a classe era antes)
+        __init__ = Cliente.__init__
+
+    # Aquece o pandas (importações e caches) antes de medir
+    ClienteBatch.from_dicts(registros[:100]).to_clientes()
+
+    def medir(descricao, criar):
+        # Tempo e memória em execuções separadas: o tracemalloc deixa tudo mais lento
+        inicio = time.perf_counter()
+        resultado = criar()
+        segundos = time.perf_counter() - inicio
+        del resultado
+        tracemalloc.start()
+        resultado = criar()
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{descricao:<28} {segundos * 1000:9.1f} ms  {memoria / 2**20:8.1f} MiB")
+        return resultado
+
+    print(f"{quantidade} chamados (memória retida pelo resultado, sem contar os dicts de entrada)")
+    medir("Cliente sem __slots__", lambda: [ClienteSemSlots(**r) for r in registros])
+    clientes = medir("Cliente com __slots__", lambda: [Cliente(**r) for r in registros])
+    lote = medir("ClienteBatch.from_dicts", lambda: ClienteBatch.from_dicts(registros))
+    medir("ClienteBatch.from_clientes", lambda: ClienteBatch.from_clientes(clientes))
+    quadro = lote.to_dataframe().astype({"data": str, **{coluna: object for coluna in ClienteBatch.CATEGORIAS}})
+    medir("ClienteBatch.from_dataframe", lambda: ClienteBatch.from_dataframe(quadro))
+    medir("ClienteBatch.to_dicts", lote.to_dicts)
+    medir("ClienteBatch.to_clientes", lote.to_clientes)
+    # Textos em colunas Arrow ficam fora do tracemalloc; memoria() conta tudo
+    print(f"{'ClienteBatch.memoria()':<28} {'':>12} {lote.memoria() / 2**20:8.1f} MiB")
@@ -0,0 +1,54 @@
+import threading
+from collections import Counter
+
+class Contadores:
+    """
+    Contagens por valor de algumas colunas de uma tabela (ex.: status, pendência).
+
+    São montadas numa única passada agrupada quando o snapshot é carregado e
+    depois ajustadas pelo delta de cada mudança (linhas que saíram e que
+    entraram), sem recontar a tabela.
+    """
+
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        self.contagens = {coluna: Counter() for coluna in self.colunas}
+        self.pronto = False
+        self._lock = threading.Lock()
+
+    def reconstruir(self, df):
+        """Recalcula tudo a partir dos registros completos da tabela"""
+        contagens = self._contar(df)
+        with self._lock:
+            self.contagens = contagens
+            self.pronto = True
+
+    def aplicar(self, antigos, novos):
+        """Desconta as linhas que saíram (`antigos`) e soma as que entraram (`novos`)"""
+        saida = self._contar(antigos)
+        entrada = self._contar(novos)
+        with self._lock:
+            for coluna in self.colunas:
+                atual = self.contagens[coluna]
+                atual.update(entrada[coluna])
+                atual.subtract(saida[coluna])
+                for valor in [v for v, n in atual.items() if n <= 0]:
+                    del atual[valor]
+
+    def obter(self):
+        """Cópia das contagens: {coluna: {valor: quantidade}}"""
+        with self._lock:
+            return {coluna: dict(contagem) for coluna, contagem in self.contagens.items()}
+
+    def _contar(self, df):
+        contagens = {coluna: Counter() for coluna in self.colunas}
+        if df is None or df.empty:
+            return contagens
+        # Uma passada agrupada pelas colunas; as contagens de cada coluna saem dos totais do grupo
+        grupos = df.groupby(self.colunas, dropna=False, observed=True).size()
+        for chave, quantidade in grupos.items():
+            chave = chave if isinstance(chave, tuple) else (chave,)
+            for coluna, valor in zip(self.colunas, chave):
+                if valor == valor and valor is not None:  # ignora nulos
+                    contagens[coluna][valor] += int(quantidade)
+        return contagens
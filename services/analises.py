@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+# Frequências aceitas para as séries de abertura/backlog (início de cada período)
+FREQUENCIAS = {"Semana": "W-MON", "Mês": "MS"}
+# Faixas (em dias desde a abertura) do histograma de envelhecimento
+FAIXAS_IDADE = [-np.inf, 7, 30, 90, 180, 365, np.inf]
+ROTULOS_IDADE = ["até 7 dias", "8–30 dias", "31–90 dias", "91–180 dias", "181–365 dias", "mais de 1 ano"]
+
+def _por_periodo(df, frequencia):
+    """Quantidade por (Período, Pendência) em formato largo, um período por linha"""
+    contagem = (
+        df.groupby([pd.Grouper(key="Data", freq=FREQUENCIAS[frequencia], label="left", closed="left"), "Pendência"],
+                   observed=True)
+        .size()
+        .unstack("Pendência", fill_value=0)
+    )
+    contagem.index.name = "Período"
+    contagem.columns = contagem.columns.astype(str)
+    return contagem
+
+def _longo(largo, valor):
+    return largo.reset_index().melt(id_vars="Período", var_name="Pendência", value_name=valor)
+
+def aberturas_por_periodo(df, frequencia="Mês"):
+    """Chamados abertos em cada período, por Pendência (formato longo)"""
+    return _longo(_por_periodo(df.dropna(subset=["Data"]), frequencia), "Chamados")
+
+def backlog_acumulado(df, frequencia="Mês"):
+    """
+    Chamados ainda abertos hoje, acumulados pela data de abertura, por Pendência.
+
+    A tabela não guarda a data de conclusão, então o backlog histórico exato não pode
+    ser reconstruído; a série mostra como o backlog atual foi se formando.
+    """
+    abertos = df[(df["Status"] == "Aberto").to_numpy()].dropna(subset=["Data"])
+    return _longo(_por_periodo(abertos, frequencia).cumsum(), "Backlog")
+
+def envelhecimento(df, hoje=None):
+    """Chamados abertos por faixa de dias desde a abertura e por Pendência"""
+    hoje = pd.Timestamp(hoje if hoje is not None else pd.Timestamp.today()).normalize()
+    abertos = df[(df["Status"] == "Aberto").to_numpy()].dropna(subset=["Data"])
+    dias = (hoje - abertos["Data"]).dt.days
+    faixas = pd.cut(dias, FAIXAS_IDADE, labels=ROTULOS_IDADE)
+    contagem = abertos.groupby([faixas.rename("Faixa"), "Pendência"], observed=False).size()
+    return contagem.rename("Chamados").reset_index().astype({"Faixa": str, "Pendência": str})
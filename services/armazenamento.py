@@ -0,0 +1,181 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+# Onde ficam os chamados: "supabase" (padrão) ou "sqlite" (arquivo local, ver services/sqlite.py)
+BACKEND = os.getenv("CHAMADOS_BACKEND", "supabase")
+# Erro de salvar_em_lote para IDs que não existem mais (as gravações não recriam chamados)
+NAO_ENCONTRADO = "Chamado não encontrado (pode ter sido excluído por outra pessoa)."
+
+class BackendArmazenamento(ABC):
+    """
+    Operações de dados usadas pelas telas de chamados, independentes do banco.
+
+    Registros são dicts com os nomes de coluna do banco. Filtros de consulta:
+    `igual` ({coluna: valor}), `termo` e `busca` ({"texto": [...], "numero": [...]}),
+    em que o termo é procurado (contém, sem diferenciar maiúsculas) nas colunas de
+    texto e comparado por igualdade nas numéricas quando for um número.
+
+    Os métodos abstratos são obrigatórios: um backend incompleto falha ao ser criado.
+    """
+
+    # Se salvar_em_lote(..., tudo_ou_nada=True) grava tudo numa única transação
+    tudo_ou_nada_disponivel = True
+
+    @abstractmethod
+    def ler(self, tabela, colunas="*", desde=None, progresso=None):
+        """
+        Todas as linhas (DataFrame) ordenadas por data_abertura e id. Com
+        `desde=(coluna, valor, inclusivo)` só as linhas com coluna > valor (>= se inclusivo).
+        """
+
+    @abstractmethod
+    def iterar(self, tabela, colunas="*", tamanho_lote=1000):
+        """
+        Gera as linhas em lotes (listas de registros) ordenadas por data_abertura e id,
+        sem manter mais de um lote em memória.
+        """
+
+    @abstractmethod
+    def contar(self, tabela, igual=None, termo="", busca=None):
+        """Quantidade de linhas que atendem aos filtros"""
+
+    @abstractmethod
+    def consultar(self, tabela, colunas="*", igual=None, termo="", busca=None, inicio=0, tamanho=100):
+        """Linhas [inicio, inicio + tamanho) que atendem aos filtros, ordenadas por data_abertura e id"""
+
+    @abstractmethod
+    def agrupar(self, tabela, colunas):
+        """Linhas {coluna: valor, ..., "count": n} agrupadas pelas colunas"""
+
+    @abstractmethod
+    def inserir(self, tabela, registro):
+        """Insere o registro e devolve as linhas gravadas (com id)"""
+
+    @abstractmethod
+    def inserir_em_lote(self, tabela, registros):
+        """Insere os registros (todos com as mesmas colunas) numa só transação; devolve quantos"""
+
+    @abstractmethod
+    def salvar_em_lote(self, tabela, alteracoes, tudo_ou_nada=False):
+        """
+        Atualiza por id [{"id": ..., "data": {...}}, ...] só com as colunas em "data";
+        IDs inexistentes voltam como erro (NAO_ENCONTRADO), sem recriar o chamado.
+        Devolve (salvos, [(id, erro), ...]).
+        """
+
+    def assinar_mudancas(self, sincronizador):
+        """Liga (se o banco oferecer) o recebimento de mudanças por push para o sincronizador"""
+
+    def agregacao_indisponivel(self, erro):
+        """True se o erro de agrupar diz que o banco não oferece a agregação (e não vale tentar de novo)"""
+        return False
+
+class BackendSupabase(BackendArmazenamento):
+    """PostgREST pelo cliente Supabase: leituras no cliente compartilhado, gravações como o usuário da sessão"""
+
+    # Agregação: count() agrupado do PostgREST (exige db-aggregates-enabled) ou, com
+    # CHAMADOS_AGREGADOS_RPC, uma função com o mesmo formato de retorno, por exemplo:
+    #   create function contagens_chamados(tabela text)
+    #   returns table(status text, pendencia_retorno text, usuario_resp text, count bigint)
+    #   language plpgsql stable as $$ begin
+    #     return query execute format('select status::text, pendencia_retorno::text,
+    #       usuario_resp::text, count(*) from %I group by 1, 2, 3', tabela);
+    #   end $$;
+    AGREGADOS_RPC = os.getenv("CHAMADOS_AGREGADOS_RPC", "")
+    # Erros do PostgREST que significam "sem agregação neste banco": PGRST123 (agregações
+    # desligadas), PGRST202 e 42883 (função de CHAMADOS_AGREGADOS_RPC inexistente)
+    ERROS_SEM_AGREGACAO = ("PGRST123", "PGRST202", "42883")
+
+    @property
+    def tudo_ou_nada_disponivel(self):
+        # Só com a função de gravação (ver SALVAR_RPC em services/supabase.py)
+        from services.supabase import SALVAR_RPC
+        return bool(SALVAR_RPC)
+
+    def ler(self, tabela, colunas="*", desde=None, progresso=None):
+        from services.supabase import buscar_paginado
+        filtro = None
+        if desde is not None:
+            coluna, valor, inclusivo = desde
+            filtro = (lambda consulta: consulta.gte(coluna, valor)) if inclusivo else (lambda consulta: consulta.gt(coluna, valor))
+        return buscar_paginado(tabela, colunas, progresso=progresso, filtro=filtro)
+
+    def iterar(self, tabela, colunas="*", tamanho_lote=1000):
+        from services.supabase import iterar_paginas
+        return iterar_paginas(tabela, colunas, tamanho_pagina=tamanho_lote)
+
+    def contar(self, tabela, igual=None, termo="", busca=None):
+        from services.supabase import obter_cliente
+        consulta = obter_cliente().table(tabela).select("id", count="exact", head=True)
+        return self._filtrar(consulta, igual, termo, busca).execute().count or 0
+
+    def consultar(self, tabela, colunas="*", igual=None, termo="", busca=None, inicio=0, tamanho=100):
+        from services.supabase import obter_cliente
+        consulta = self._filtrar(obter_cliente().table(tabela).select(colunas), igual, termo, busca)
+        consulta = consulta.order("data_abertura", desc=False).order("id", desc=False)
+        return consulta.range(inicio, inicio + tamanho - 1).execute().data or []
+
+    def agrupar(self, tabela, colunas):
+        from services.supabase import obter_cliente
+        if self.AGREGADOS_RPC:
+            return obter_cliente().rpc(self.AGREGADOS_RPC, {"tabela": tabela}).execute().data
+        return obter_cliente().table(tabela).select(f"{', '.join(colunas)}, count()").execute().data
+
+    def inserir(self, tabela, registro):
+        from services.supabase import cliente_da_sessao
+        return cliente_da_sessao().table(tabela).insert(registro).execute().data
+
+    def inserir_em_lote(self, tabela, registros):
+        from services.supabase import cliente_da_sessao, _valor_json
+        # Um único POST com a lista: o PostgREST insere tudo numa transação
+        linhas = [{coluna: _valor_json(valor) for coluna, valor in registro.items()} for registro in registros]
+        if linhas:
+            cliente_da_sessao().table(tabela).insert(linhas, returning="minimal").execute()
+        return len(linhas)
+
+    def salvar_em_lote(self, tabela, alteracoes, tudo_ou_nada=False):
+        from services.supabase import salvar_em_lote, cliente_da_sessao
+        return salvar_em_lote(tabela, alteracoes, tudo_ou_nada=tudo_ou_nada, cliente=cliente_da_sessao())
+
+    def assinar_mudancas(self, sincronizador):
+        from services.supabase import SUPABASE_URL, CHAVE_LEITURA
+        from services.tempo_real import iniciar_feed
+        # Mesma chave das leituras compartilhadas: o feed vê as mesmas linhas do snapshot
+        iniciar_feed(sincronizador, SUPABASE_URL, CHAVE_LEITURA)
+
+    def agregacao_indisponivel(self, erro):
+        return getattr(erro, "code", None) in self.ERROS_SEM_AGREGACAO
+
+    @staticmethod
+    def _valor_filtro(valor):
+        # Valores no or=(...) do PostgREST vão entre aspas para aceitar vírgulas e parênteses
+        return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    def _filtrar(self, consulta, igual, termo, busca):
+        for coluna, valor in (igual or {}).items():
+            consulta = consulta.eq(coluna, valor)
+        if termo and busca:
+            condicoes = [f"{coluna}.ilike.{self._valor_filtro(f'*{termo}*')}" for coluna in busca["texto"]]
+            if str(termo).strip().isdigit():
+                condicoes += [f"{coluna}.eq.{int(termo)}" for coluna in busca["numero"]]
+            consulta = consulta.or_(",".join(condicoes))
+        return consulta
+
+_backend = None
+_lock = threading.Lock()
+
+def obter_backend():
+    """Backend configurado em CHAMADOS_BACKEND (um por processo)"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                if BACKEND == "sqlite":
+                    from services.sqlite import BackendSQLite
+                    _backend = BackendSQLite()
+                elif BACKEND == "supabase":
+                    _backend = BackendSupabase()
+                else:
+                    raise ValueError(f"CHAMADOS_BACKEND inválido: {BACKEND!r} (use 'supabase' ou 'sqlite').")
+    return _backend
@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Segredo JWT do projeto (Settings > API). Sem ele, toda restauração de sessão vai ao servidor.
+JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+# Tokens a menos de MARGEM_RENOVACAO segundos de expirar vão ao servidor para serem renovados
+MARGEM_RENOVACAO = int(os.getenv("SUPABASE_JWT_REFRESH_MARGIN", 300))
+# Por quanto tempo (segundos) uma validação fica em cache, e quantas no máximo
+TTL_VALIDACAO = int(os.getenv("SUPABASE_JWT_CACHE_TTL", 60))
+MAX_VALIDACOES = 256
+
+_validacoes = OrderedDict()
+_lock = threading.Lock()
+
+def _base64url(parte):
+    return base64.urlsafe_b64decode(parte + "=" * (-len(parte) % 4))
+
+def decodificar_token(token, segredo):
+    """Claims do JWT HS256 se a assinatura conferir (sem checar expiração); senão None"""
+    try:
+        cabecalho, corpo, assinatura = token.split(".")
+        if json.loads(_base64url(cabecalho)).get("alg") != "HS256":
+            return None
+        esperada = hmac.new(segredo.encode(), f"{cabecalho}.{corpo}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(esperada, _base64url(assinatura)):
+            return None
+        return json.loads(_base64url(corpo))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def validar_localmente(token):
+    """
+    Claims do access token se ele for válido e não estiver perto de expirar; senão None.
+
+    A verificação (HMAC-SHA256 com SUPABASE_JWT_SECRET) fica em cache por TTL_VALIDACAO
+    segundos, pela hash do token. None significa "perguntar ao servidor" (token
+    inválido, perto de expirar ou segredo não configurado).
+    """
+    if not JWT_SECRET or not token:
+        return None
+    chave = hashlib.sha256(token.encode()).hexdigest()
+    agora = time.time()
+    with _lock:
+        item = _validacoes.get(chave)
+        if item is not None:
+            claims, valido_ate = item
+            if agora < valido_ate:
+                _validacoes.move_to_end(chave)
+                return claims
+            del _validacoes[chave]
+
+    claims = decodificar_token(token, JWT_SECRET)
+    if claims is None or claims.get("role") != "authenticated":
+        return None
+    renovar_em = claims.get("exp", 0) - MARGEM_RENOVACAO
+    if agora >= renovar_em:
+        return None
+    with _lock:
+        _validacoes[chave] = (claims, min(agora + TTL_VALIDACAO, renovar_em))
+        while len(_validacoes) > MAX_VALIDACOES:
+            _validacoes.popitem(last=False)
+    return claims
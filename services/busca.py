@@ -0,0 +1,132 @@
+import threading
+import unicodedata
+from collections import defaultdict
+
+# Tamanho dos n-gramas do índice. Termos mais curtos que isso são verificados
+# diretamente nos textos normalizados (sem passar pelo índice).
+TAMANHO_NGRAMA = 3
+# Separa as colunas no texto indexado, para um termo não casar "atravessando" duas colunas
+SEPARADOR = "\x1f"
+
+def normalizar(texto):
+    """Minúsculas e sem acentos ("Concluído" -> "concluido")"""
+    texto = str(texto)
+    if texto.isascii():
+        return texto.lower()
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def _ngramas(texto, n=TAMANHO_NGRAMA):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+class MemoNormalizacao:
+    """
+    Normaliza os textos de busca lembrando o resultado da versão anterior do
+    snapshot: entre duas versões quase todos os textos se repetem, então só os
+    novos ou alterados passam por `normalizar`.
+    """
+
+    def __init__(self):
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def normalizar(self, textos, lembrar=False):
+        """
+        Lista com os textos normalizados. Com `lembrar`, a memória passa a ser
+        exatamente estes textos (use só com o snapshot inteiro).
+        """
+        with self._lock:
+            memo = self._memo
+        normalizados = [memo.get(texto) or normalizar(texto) for texto in textos]
+        if lembrar:
+            with self._lock:
+                self._memo = dict(zip(textos, normalizados))
+        return normalizados
+
+class IndiceBusca:
+    """
+    Índice invertido de trigramas sobre os textos de busca (já normalizados) de
+    cada chamado, por ID.
+
+    `versao` é a versão do snapshot que o índice reflete: ele só responde por essa
+    versão, e quem o usa faz a varredura direta enquanto ele é reconstruído.
+    """
+
+    def __init__(self):
+        self.textos = {}
+        self.postings = defaultdict(set)
+        self.versao = None
+        self.construindo = False
+        self._lock = threading.Lock()
+
+    def iniciar_construcao(self):
+        """Reserva a (re)construção; False se outra já estiver em andamento"""
+        with self._lock:
+            if self.construindo:
+                return False
+            self.construindo = True
+            return True
+
+    def reconstruir(self, ids, textos, versao):
+        """Monta o índice de (ids, textos) fora do lock e o assume como o da `versao`"""
+        textos_novos, postings = {}, defaultdict(set)
+        self._adicionar(ids, textos, textos_novos, postings)
+        with self._lock:
+            self.textos, self.postings, self.versao = textos_novos, postings, versao
+            self.construindo = False
+
+    def atualizar(self, ids_removidos, ids, textos, versao_anterior, versao):
+        """
+        Aplica uma mudança do snapshot (`versao_anterior` -> `versao`): remove os IDs
+        indicados e (re)indexa os textos informados. Se o índice não estiver na
+        versão anterior, a mudança é ignorada e ele fica desatualizado até a próxima
+        reconstrução.
+        """
+        with self._lock:
+            if self.versao is None or self.versao != versao_anterior:
+                return False
+            self._remover(ids_removidos)
+            self._remover(ids)
+            self._adicionar(ids, textos, self.textos, self.postings)
+            self.versao = versao
+            return True
+
+    def buscar(self, termo, versao):
+        """IDs cujo texto contém o termo (conjunto), ou None se o índice não estiver na `versao`"""
+        termo = normalizar(termo)
+        with self._lock:
+            if self.versao != versao:
+                return None
+            if len(termo) < TAMANHO_NGRAMA:
+                candidatos = self.textos.keys()
+            else:
+                listas = sorted((self.postings.get(g, set()) for g in _ngramas(termo)), key=len)
+                candidatos = set.intersection(*listas) if listas else set()
+            return {id_ for id_ in candidatos if termo in self.textos[id_]}
+
+    @staticmethod
+    def _adicionar(ids, textos, destino, postings):
+        for id_, texto in zip(ids, textos):
+            destino[id_] = texto
+            for ngrama in _ngramas(texto):
+                postings[ngrama].add(id_)
+
+    def _remover(self, ids):
+        for id_ in ids:
+            texto = self.textos.pop(id_, None)
+            if texto is None:
+                continue
+            for ngrama in _ngramas(texto):
+                lista = self.postings.get(ngrama)
+                if lista is not None:
+                    lista.discard(id_)
+                    if not lista:
+                        del self.postings[ngrama]
+
+def textos_de_busca(df, colunas):
+    """Concatena as colunas pesquisáveis de cada linha (nulos viram texto vazio)"""
+    partes = [df[coluna].astype(object).where(df[coluna].notna(), "").astype(str) for coluna in colunas]
+    textos = partes[0]
+    for parte in partes[1:]:
+        textos = textos + SEPARADOR + parte
+    return textos.tolist()
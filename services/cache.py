@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+# Versão dos dados de cada tabela. As funções em cache recebem a versão como
+# argumento, então gravar em uma tabela só invalida as entradas derivadas dela
+# (carga, visões filtradas, agregados e gráficos), sem o st.cache_data.clear()
+# que descartava o cache de todas as tabelas e de todos os usuários.
+_versoes = {}
+_lock = threading.Lock()
+
+def versao_tabela(tabela):
+    """Versão atual dos dados da tabela (usar como argumento das funções em cache)"""
+    return _versoes.get(tabela, 0)
+
+def invalidar_tabela(tabela):
+    """Marca os dados da tabela como alterados; as entradas antigas deixam de ser usadas"""
+    with _lock:
+        _versoes[tabela] = _versoes.get(tabela, 0) + 1
+        return _versoes[tabela]
+
+class CacheLRU:
+    """
+    Cache LRU compartilhado entre sessões, limitado em itens e em bytes.
+
+    `tamanho(valor)` estima o tamanho de cada valor; os menos usados saem
+    primeiro quando algum dos limites é ultrapassado.
+    """
+
+    def __init__(self, max_itens=64, max_bytes=256 * 1024 * 1024, tamanho=None):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.tamanho = tamanho or (lambda valor: 0)
+        self.bytes = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular):
+        """Devolve o valor da chave, calculando (fora do lock) e guardando se faltar"""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave][0]
+        valor = calcular()
+        tamanho = self.tamanho(valor)
+        with self._lock:
+            if chave in self._itens:
+                # Outra thread calculou ao mesmo tempo: todos recebem o mesmo objeto
+                return self._itens[chave][0]
+            self._itens[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self._itens and (len(self._itens) > self.max_itens or self.bytes > self.max_bytes):
+                _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+                self.bytes -= tamanho_antigo
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
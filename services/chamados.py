@@ -0,0 +1,482 @@
+# Repositório dos chamados: projeção de colunas, renomeação, tipos e cache de cada
+# tabela ficam aqui. As páginas (Pixeon, Fácil e Dashboard) leem o mesmo snapshot,
+# então cada tabela é buscada uma única vez por atualização.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import streamlit as st
+from services.supabase import barra_progresso
+from services.armazenamento import obter_backend
+from services.sincronizacao import obter_sincronizador
+from services.busca import IndiceBusca, MemoNormalizacao, textos_de_busca, normalizar, TAMANHO_NGRAMA
+from services.cache import CacheLRU, invalidar_tabela
+from services.agregados import Contadores
+from services.analises import aberturas_por_periodo, backlog_acumulado, envelhecimento
+
+TABELAS = {
+    "Chamados": {
+        "renomear": {
+            "id": "ID",
+            "chamados_sh": "Chamados SH",
+            "chamados_px": "Chamados Pixeon",
+            "titulo": "Título",
+            "data_abertura": "Data",
+            "pendencia_retorno": "Pendência",
+            "usuario_resp": "Usuário Resp",
+            "status": "Status",
+            "observacao": "Observação",
+        },
+        "categorias": {
+            "Status": ["Aberto", "Concluído"],
+            "Pendência": ["Pixeon", "SH"],
+        },
+        "busca": ["Chamados SH", "Chamados Pixeon", "Título", "Usuário Resp", "Observação"],
+        # Pesquisa no servidor: ilike nas colunas de texto, igualdade nas numéricas
+        "busca_servidor": {"texto": ["chamados_px", "titulo", "usuario_resp", "observacao"], "numero": ["chamados_sh"]},
+    },
+    "Chamados_fc": {
+        "renomear": {
+            "id": "ID",
+            "chamado_sd": "Chamados SH",
+            "chamado_facil": "Chamados Fácil",
+            "titulo": "Título",
+            "data_abertura": "Data",
+            "pendencia_retorno": "Pendência",
+            "usuario_resp": "Usuário Resp",
+            "status": "Status",
+            "observacao": "Observação",
+        },
+        "categorias": {
+            "Status": ["Aberto", "Concluído"],
+            "Pendência": ["Fácil", "Nordeste"],
+        },
+        "busca": ["Chamados SH", "Chamados Fácil", "Título", "Usuário Resp", "Observação"],
+        "busca_servidor": {"texto": ["chamado_facil", "titulo", "usuario_resp", "observacao"], "numero": ["chamado_sd"]},
+    },
+}
+
+# Colunas de poucos valores distintos (além de Status e Pendência, cujas
+# categorias fixas vêm de TABELAS)
+COLUNAS_CATEGORICAS = ["Status", "Pendência", "Usuário Resp"]
+# Texto livre; com CHAMADOS_ARROW_STRINGS=1 (e pyarrow instalado) usa strings do Arrow
+COLUNAS_TEXTO = ["Título", "Observação"]
+USAR_ARROW = os.getenv("CHAMADOS_ARROW_STRINGS", "0") == "1"
+# Valor inicial da opção "Consultar no servidor" (filtros e pesquisa no PostgREST,
+# buscando só a página exibida) — para quando a tabela não couber mais em memória
+PUSHDOWN_PADRAO = os.getenv("CHAMADOS_PUSHDOWN", "0") == "1"
+# Valor inicial da opção "Paginar a lista": o editor recebe só a página exibida
+PAGINAR_PADRAO = os.getenv("CHAMADOS_PAGINAR", "1") == "1"
+# Texto de busca normalizado (sem acentos e em minúsculas) guardado no snapshot tipado
+COLUNA_BUSCA = "_busca"
+# Índice de trigramas (montado em segundo plano) em vez da varredura da COLUNA_BUSCA.
+# Só compensa com tabelas grandes e muitas pesquisas: ocupa bem mais memória que a coluna.
+INDICE_BUSCA = os.getenv("CHAMADOS_INDICE_BUSCA", "0") == "1"
+
+def colunas_selecionadas(tabela):
+    """Colunas pedidas ao banco (só as que as telas usam)"""
+    return ", ".join(TABELAS[tabela]["renomear"])
+
+def colunas_banco(tabela):
+    """Coluna exibida -> coluna do banco, para montar as gravações"""
+    return {exibida: banco for banco, exibida in TABELAS[tabela]["renomear"].items() if banco != "id"}
+
+def sincronizador(tabela):
+    """Sincronizador (snapshot compartilhado por processo) da tabela"""
+    return obter_sincronizador(tabela, colunas_selecionadas(tabela))
+
+def idade_snapshot(tabela):
+    """Idade em segundos do snapshot da tabela (None se ainda não carregou)"""
+    return sincronizador(tabela).idade()
+
+def obter_chamados(tabela):
+    """Devolve os chamados da tabela já renomeados e tipados (vazio em caso de erro)"""
+    return obter_chamados_versao(tabela)[0]
+
+def obter_chamados_versao(tabela):
+    """Como obter_chamados, mas devolve (df, versão do snapshot)"""
+    try:
+        sinc = sincronizador(tabela)
+        # Mudanças de outras pessoas chegam por push enquanto o feed estiver conectado
+        obter_backend().assinar_mudancas(sinc)
+        registros, versao = sinc.obter_snapshot(
+            progresso=barra_progresso("Carregando chamados...")
+        )
+        if registros.empty:
+            return pd.DataFrame(), versao
+        return _preparar(tabela, versao, registros), versao
+    except Exception as e:
+        st.error(f"Erro ao carregar os chamados: {str(e)}")
+        return pd.DataFrame(), None
+
+# Frames tipados por (tabela, versão). Todas as sessões recebem o mesmo objeto
+# (st.cache_data devolveria uma cópia desserializada a cada rodada); não alterar.
+_preparados = CacheLRU(
+    max_itens=4,
+    max_bytes=int(os.getenv("CHAMADOS_SNAPSHOTS_MB", 512)) * 1024 * 1024,
+    tamanho=lambda df: int(df.memory_usage(deep=True).sum()),
+)
+
+# Normalizações da versão anterior de cada tabela, reaproveitadas na seguinte
+_normalizacoes = {tabela: MemoNormalizacao() for tabela in TABELAS}
+
+def _preparar(tabela, versao, registros):
+    return _preparados.obter(
+        (tabela, versao),
+        lambda: tipar(tabela, registros.rename(columns=TABELAS[tabela]["renomear"]), _normalizacoes[tabela]),
+    )
+
+def _arrow_disponivel():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def tipar(tabela, df, normalizacao=None):
+    """
+    Aplica o esquema compacto a um frame já renomeado e o ordena por Data e ID.
+
+    IDs viram inteiros de 32 bits (a sequência é nossa); números SH, que vêm de
+    outro sistema, continuam com 64 bits para não estourar. Status/Pendência/Usuário
+    Resp viram categorias e a Data é lida uma única vez (só a parte da data).
+    COLUNA_BUSCA recebe o texto de busca normalizado; com `normalizacao` (snapshot
+    inteiro) os textos que não mudaram desde a versão anterior não são refeitos.
+    """
+    df = df.copy()
+    df["ID"] = pd.to_numeric(df["ID"], errors="coerce").fillna(0).astype("int32")
+    df["Chamados SH"] = pd.to_numeric(df["Chamados SH"], errors='coerce').fillna(0).astype("int64")
+    df["Data"] = pd.to_datetime(df["Data"], errors="coerce").dt.normalize()
+
+    categorias = TABELAS[tabela]["categorias"]
+    for coluna in COLUNAS_CATEGORICAS:
+        coluna_cat = df[coluna].astype("category")
+        faltando = [c for c in categorias.get(coluna, []) if c not in coluna_cat.cat.categories]
+        df[coluna] = coluna_cat.cat.add_categories(faltando) if faltando else coluna_cat
+
+    if USAR_ARROW and _arrow_disponivel():
+        for coluna in COLUNAS_TEXTO:
+            df[coluna] = df[coluna].astype("string[pyarrow]")
+
+    textos = textos_de_busca(df, TABELAS[tabela]["busca"])
+    if normalizacao is not None:
+        df[COLUNA_BUSCA] = normalizacao.normalizar(textos, lembrar=True)
+    else:
+        df[COLUNA_BUSCA] = [normalizar(texto) for texto in textos]
+
+    return df.sort_values(by=["Data", "ID"], ascending=[True, True])
+
+def relatorio_memoria(tabela):
+    """
+    Compara o uso de memória do snapshot tipado com o layout antigo
+    (texto como objetos Python e inteiros de 64 bits). Valores em bytes.
+    """
+    df = obter_chamados(tabela)
+    if df.empty:
+        return pd.DataFrame(columns=["Coluna", "Antes", "Agora", "Economia"])
+
+    antigo = df.astype({
+        coluna: ("int64" if pd.api.types.is_integer_dtype(df[coluna]) else object)
+        for coluna in df.columns if coluna != "Data"
+    })
+    antes = antigo.memory_usage(deep=True, index=False)
+    agora = df.memory_usage(deep=True, index=False)
+    relatorio = pd.DataFrame({"Coluna": antes.index, "Antes": antes.values, "Agora": agora.values})
+    total = pd.DataFrame([{"Coluna": "Total", "Antes": antes.sum(), "Agora": agora.sum()}])
+    relatorio = pd.concat([relatorio, total], ignore_index=True)
+    relatorio["Economia"] = 1 - relatorio["Agora"] / relatorio["Antes"]
+    return relatorio
+
+# Estruturas derivadas de cada snapshot, mantidas em dia pelos ouvintes do sincronizador
+_indices = {}
+_contadores = {}
+_lock_derivados = threading.Lock()
+# Colunas (do banco) com contagens mantidas por delta
+COLUNAS_CONTADAS = ["status", "pendencia_retorno", "usuario_resp"]
+
+def _contadores_tabela(tabela):
+    """Contadores da tabela, reconstruídos na carga completa e ajustados a cada delta"""
+    with _lock_derivados:
+        if tabela not in _contadores:
+            contadores = Contadores(COLUNAS_CONTADAS)
+
+            def ouvinte(antigos, novos, completo):
+                if completo:
+                    contadores.reconstruir(novos)
+                else:
+                    contadores.aplicar(antigos, novos)
+
+            sincronizador(tabela).registrar_ouvinte(ouvinte)
+            _contadores[tabela] = contadores
+        return _contadores[tabela]
+
+def contagens_tabela(tabela):
+    """
+    Contagens por Status, Pendência e Usuário Resp da tabela inteira, no formato
+    {"Status": {"Aberto": n, ...}, "Pendência": {...}, "Usuário Resp": {...}}.
+    """
+    try:
+        return _contagens_locais(tabela)
+    except Exception as e:
+        st.error(f"Erro ao carregar os chamados: {str(e)}")
+        renomear = TABELAS[tabela]["renomear"]
+        return {renomear[coluna]: {} for coluna in COLUNAS_CONTADAS}
+
+def _contagens_locais(tabela):
+    """Como contagens_tabela, mas sem desenhar: o erro da primeira carga é relançado"""
+    contadores = _contadores_tabela(tabela)
+    if not contadores.pronto:
+        # Ainda sem snapshot: a primeira carga notifica os contadores
+        sincronizador(tabela).obter()
+    renomear = TABELAS[tabela]["renomear"]
+    return {renomear[coluna]: valores for coluna, valores in contadores.obter().items()}
+
+def _indice(tabela):
+    """Índice de busca da tabela; as mudanças do snapshot são aplicadas enquanto ele estiver em dia"""
+    with _lock_derivados:
+        if tabela not in _indices:
+            sinc = sincronizador(tabela)
+            indice = IndiceBusca()
+            ultima_versao = [None]
+
+            def ouvinte(antigos, novos, completo):
+                # Chamado com o snapshot já trocado: sinc.versao é a versão nova
+                versao_anterior, ultima_versao[0] = ultima_versao[0], sinc.versao
+                if completo:
+                    # Snapshot trocado inteiro: a próxima pesquisa pede a reconstrução
+                    return
+                removidos = [] if antigos is None else antigos["id"].tolist()
+                novos = tipar(tabela, novos.rename(columns=TABELAS[tabela]["renomear"]))
+                indice.atualizar(removidos, novos["ID"].tolist(), novos[COLUNA_BUSCA].tolist(), versao_anterior, sinc.versao)
+
+            sinc.registrar_ouvinte(ouvinte)
+            _indices[tabela] = indice
+        return _indices[tabela]
+
+def _reconstruir_indice(tabela):
+    """Reconstrói o índice numa thread, a partir do snapshot atual (sem bloquear a rodada)"""
+    indice = _indice(tabela)
+    if not indice.iniciar_construcao():
+        return
+
+    def construir():
+        try:
+            registros, versao = sincronizador(tabela).atual()
+            df = _preparar(tabela, versao, registros) if registros is not None and not registros.empty else pd.DataFrame()
+            if df.empty:
+                indice.reconstruir([], [], versao)
+            else:
+                indice.reconstruir(df["ID"].tolist(), df[COLUNA_BUSCA].tolist(), versao)
+        finally:
+            indice.construindo = False
+
+    threading.Thread(target=construir, daemon=True).start()
+
+def mascara_busca(tabela, df, termo, versao=None):
+    """
+    Máscara das linhas de `df` cujo texto de busca contém o termo, sem diferenciar
+    maiúsculas nem acentos. Com INDICE_BUSCA usa o índice quando ele estiver na
+    versão de `df`; senão (ou enquanto ele é reconstruído) varre COLUNA_BUSCA.
+    """
+    termo = normalizar(termo)
+    if INDICE_BUSCA and versao is not None and len(termo) >= TAMANHO_NGRAMA:
+        ids = _indice(tabela).buscar(termo, versao)
+        if ids is not None:
+            return np.isin(df["ID"].to_numpy(), np.fromiter(ids, dtype="int64", count=len(ids)))
+        _reconstruir_indice(tabela)
+    return df[COLUNA_BUSCA].str.contains(termo, regex=False).to_numpy(dtype=bool)
+
+def filtrar(tabela, df, status="Todos", pendencia="Todos", termo="", versao=None):
+    """Aplica os filtros da barra lateral com uma única seleção posicional"""
+    mascara = np.ones(len(df), dtype=bool)
+    if status != "Todos":
+        mascara &= (df["Status"] == status).to_numpy()
+    if pendencia != "Todos":
+        mascara &= (df["Pendência"] == pendencia).to_numpy()
+    if termo:
+        mascara &= mascara_busca(tabela, df, termo, versao)
+    return df.iloc[np.flatnonzero(mascara)]
+
+# Visões já filtradas e numeradas, compartilhadas entre as sessões.
+# A chave inclui a versão do snapshot, então uma gravação não reaproveita visões antigas.
+_visoes = CacheLRU(
+    max_itens=int(os.getenv("CHAMADOS_VISOES_MAX", 64)),
+    max_bytes=int(os.getenv("CHAMADOS_VISOES_MB", 256)) * 1024 * 1024,
+    tamanho=lambda df: int(df.memory_usage(deep=True).sum()),
+)
+
+def montar_visao(df, inicio=0):
+    """Índice posicional e coluna "Nº" (contador exibido) a partir de `inicio` + 1"""
+    df = df.drop(columns=COLUNA_BUSCA, errors="ignore").reset_index(drop=True)
+    df["Nº"] = np.arange(inicio + 1, inicio + len(df) + 1)
+    return df
+
+def visao_filtrada(tabela, df, versao, status="Todos", pendencia="Todos", termo=""):
+    """
+    Frame pronto para exibição (filtrado, ordenado por Data e ID, com "Nº").
+
+    Memorizado por (tabela, versão, status, pendência, termo normalizado): a visão
+    mais comum ("Aberto / Todos / sem pesquisa") é calculada uma vez por versão.
+    O frame devolvido é compartilhado e não deve ser alterado.
+    """
+    if df.empty:
+        return df
+    termo = normalizar(termo.strip()) if termo else ""
+    chave = (tabela, versao, status, pendencia, termo)
+    return _visoes.obter(chave, lambda: montar_visao(filtrar(tabela, df, status, pendencia, termo, versao)))
+
+# Tendências e envelhecimento por (tabela, versão, frequência, dia); o dia entra na
+# chave porque a idade dos chamados abertos muda de um dia para o outro
+_analises = CacheLRU(max_itens=16)
+
+def analises_tabela(tabela, frequencia="Mês"):
+    """
+    Aberturas por período, backlog acumulado e envelhecimento dos chamados abertos
+    (frames longos, prontos para os gráficos). None se a tabela estiver vazia.
+    """
+    df, versao = obter_chamados_versao(tabela)
+    if df.empty:
+        return None
+    hoje = pd.Timestamp.today().normalize()
+    return _analises.obter((tabela, versao, frequencia, hoje), lambda: {
+        "aberturas": aberturas_por_periodo(df, frequencia),
+        "backlog": backlog_acumulado(df, frequencia),
+        "envelhecimento": envelhecimento(df, hoje),
+    })
+
+def _filtros(tabela, status, pendencia, termo):
+    """Filtros da barra lateral no formato do backend (igual, termo, busca)"""
+    igual = {}
+    if status != "Todos":
+        igual["status"] = status
+    if pendencia != "Todos":
+        igual["pendencia_retorno"] = pendencia
+    return {"igual": igual, "termo": termo, "busca": TABELAS[tabela]["busca_servidor"]}
+
+def contar_servidor(tabela, status="Todos", pendencia="Todos", termo=""):
+    """Quantidade de linhas que atendem aos filtros (consulta só de contagem; 0 em caso de erro)"""
+    try:
+        return _contar_servidor(tabela, status, pendencia, termo)
+    except Exception as e:
+        st.error(f"Erro ao contar os chamados: {str(e)}")
+        return 0
+
+def _contar_servidor(tabela, status="Todos", pendencia="Todos", termo=""):
+    return obter_backend().contar(tabela, **_filtros(tabela, status, pendencia, termo))
+
+def contagens_servidor(tabela, versao=0):
+    """Contagens por Status e por Pendência feitas no banco (mesmo formato de contagens_tabela; vazias em caso de erro)"""
+    try:
+        return _contagens_servidor(tabela, versao)
+    except Exception as e:
+        st.error(f"Erro ao carregar as contagens: {str(e)}")
+        return {"Status": {}, "Pendência": {}}
+
+# Só o resultado completo fica em cache: uma falha não deixa contagens zeradas por 30 s
+@st.cache_data(ttl=30, max_entries=8)
+def _contagens_servidor(tabela, versao=0):
+    categorias = TABELAS[tabela]["categorias"]
+    return {
+        "Status": {valor: _contar_servidor(tabela, status=valor) for valor in categorias["Status"]},
+        "Pendência": {valor: _contar_servidor(tabela, pendencia=valor) for valor in categorias["Pendência"]},
+    }
+
+# Agregados do dashboard calculados no banco (ver BackendArmazenamento.agrupar).
+# Vira False só quando o banco diz que não oferece a agregação: daí em diante o
+# processo usa os contadores locais. Outras falhas usam os contadores só nessa vez.
+_agregacao_no_banco = True
+
+# Limite de consultas simultâneas quando a tela busca várias tabelas de uma vez
+CONSULTAS_PARALELAS = int(os.getenv("CHAMADOS_CONSULTAS_PARALELAS", 4))
+
+def em_paralelo(funcao, tabelas):
+    """
+    Executa `funcao(tabela)` para as tabelas num pool limitado e devolve {tabela: resultado}.
+
+    As threads recebem o contexto da sessão (para o st.cache_data gravar nos mesmos
+    caches), mas `funcao` não deve desenhar nada. Erros são relançados aqui.
+    """
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    contexto = get_script_run_ctx()
+
+    def executar(tabela):
+        add_script_run_ctx(threading.current_thread(), contexto)
+        return funcao(tabela)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(CONSULTAS_PARALELAS, len(tabelas)))) as pool:
+        futuros = {tabela: pool.submit(executar, tabela) for tabela in tabelas}
+    return {tabela: futuro.result() for tabela, futuro in futuros.items()}
+
+def aquecer_snapshots(tabelas):
+    """Carrega os snapshots das tabelas ao mesmo tempo (erros aparecem depois, em obter_chamados)"""
+    def carregar(tabela):
+        try:
+            sincronizador(tabela).obter()
+        except Exception:
+            pass
+    em_paralelo(carregar, tabelas)
+
+@st.cache_data(ttl=30, max_entries=8)
+def agregados_dashboard(tabela, versao=0):
+    """
+    Contagens por Status, Pendência e Usuário Resp (formato de contagens_tabela)
+    a partir de algumas dezenas de grupos calculados no banco, sem baixar a tabela.
+    Se o banco não aceitar a agregação, cai nos contadores do snapshot local.
+    Roda nas threads de em_paralelo, então não desenha: erros são relançados.
+    """
+    global _agregacao_no_banco
+    if _agregacao_no_banco:
+        backend = obter_backend()
+        try:
+            grupos = backend.agrupar(tabela, COLUNAS_CONTADAS)
+        except Exception as e:
+            if backend.agregacao_indisponivel(e):
+                _agregacao_no_banco = False
+        else:
+            contagens = {coluna: {} for coluna in COLUNAS_CONTADAS}
+            for grupo in grupos or []:
+                for coluna in COLUNAS_CONTADAS:
+                    valor = grupo.get(coluna)
+                    if valor is not None:
+                        contagens[coluna][valor] = contagens[coluna].get(valor, 0) + int(grupo["count"])
+            renomear = TABELAS[tabela]["renomear"]
+            return {renomear[coluna]: valores for coluna, valores in contagens.items()}
+    return _contagens_locais(tabela)
+
+def consultar_pagina(tabela, status, pendencia, termo, inicio, tamanho):
+    """Busca só as linhas [inicio, inicio + tamanho) que atendem aos filtros, já tipadas (vazio em caso de erro)"""
+    try:
+        registros = obter_backend().consultar(
+            tabela, colunas_selecionadas(tabela), inicio=inicio, tamanho=tamanho, **_filtros(tabela, status, pendencia, termo)
+        )
+        if not registros:
+            return pd.DataFrame()
+        df = tipar(tabela, pd.DataFrame(registros).rename(columns=TABELAS[tabela]["renomear"]))
+        return montar_visao(df, inicio)
+    except Exception as e:
+        st.error(f"Erro ao consultar os chamados: {str(e)}")
+        return pd.DataFrame()
+
+def inserir_chamado(tabela, novo_chamado):
+    """Insere o chamado (como o usuário da sessão) e o aplica no snapshot; devolve os registros gravados"""
+    registros = obter_backend().inserir(tabela, novo_chamado)
+    _depois_de_gravar(tabela, registros)
+    return registros
+
+def tudo_ou_nada_disponivel():
+    """Se o backend grava as alterações em lote numa única transação ("tudo ou nada")"""
+    return obter_backend().tudo_ou_nada_disponivel
+
+def salvar_alteracoes(tabela, alteracoes, tudo_ou_nada=False):
+    """Grava as alterações em lote (como o usuário da sessão) e as aplica no snapshot; devolve (salvos, erros)"""
+    salvos, erros = obter_backend().salvar_em_lote(tabela, alteracoes, tudo_ou_nada=tudo_ou_nada)
+    _depois_de_gravar(tabela, salvos)
+    return salvos, erros
+
+def _depois_de_gravar(tabela, registros):
+    # Sem snapshot carregado (consulta no servidor) o mesclar não faz nada: a versão da
+    # tabela avança mesmo assim, para as contagens em cache por versão refletirem a gravação
+    sincronizador(tabela).mesclar(registros)
+    if registros:
+        invalidar_tabela(tabela)
@@ -0,0 +1,104 @@
+import pandas as pd
+import streamlit as st
+
+OPCOES_TAMANHO_PAGINA = [50, 100, 200, 500]
+
+def _data_iso(valor):
+    """Normaliza a data vinda do editor (Timestamp, date ou texto ISO) para 'YYYY-MM-DD'"""
+    if valor is None or (not isinstance(valor, str) and pd.isnull(valor)):
+        return None
+    return pd.to_datetime(valor).strftime("%Y-%m-%d")
+
+def _mesmo_valor(a, b):
+    if a is None or (not isinstance(a, str) and pd.isnull(a)):
+        return b is None or (not isinstance(b, str) and pd.isnull(b))
+    return a == b
+
+def montar_alteracoes(edited_rows, df_exibido, colunas_banco, completar=False):
+    """
+    Monta as alterações a gravar a partir do delta do st.data_editor.
+
+    `edited_rows` vem de st.session_state[<key do editor>]["edited_rows"] e tem o
+    formato {posição da linha: {coluna exibida: novo valor}}. `df_exibido` é o frame
+    passado ao editor (com a coluna "ID" e índice posicional) e `colunas_banco`
+    mapeia coluna exibida -> coluna do banco.
+
+    Cada alteração leva só as colunas que mudaram. Com `completar` (o que as telas
+    usam), leva todas as colunas editáveis da linha: conteúdos diferentes são
+    gravados em lote (upsert ou função do banco), que exige a linha completa.
+    """
+    alteracoes = []
+    for posicao, celulas in edited_rows.items():
+        original = df_exibido.iloc[int(posicao)]
+        dados = {}
+        for coluna, valor in celulas.items():
+            if coluna not in colunas_banco:
+                continue
+            anterior = original[coluna]
+            if coluna == "Data":
+                valor, anterior = _data_iso(valor), _data_iso(anterior)
+            if not _mesmo_valor(valor, anterior):
+                dados[colunas_banco[coluna]] = valor
+
+        if not dados:
+            continue
+        if completar:
+            for coluna, coluna_banco in colunas_banco.items():
+                if coluna_banco not in dados:
+                    valor = original[coluna]
+                    dados[coluna_banco] = _data_iso(valor) if coluna == "Data" else valor
+        alteracoes.append({"id": original["ID"], "data": dados})
+    return alteracoes
+
+def controles_paginacao(total, chave):
+    """
+    Desenha na barra lateral os controles de página e devolve (inicio, tamanho).
+
+    `chave` separa o estado de cada tela; a página atual é ajustada se os filtros
+    reduzirem o total de linhas.
+    """
+    tamanho = st.sidebar.selectbox("Linhas por página", OPCOES_TAMANHO_PAGINA, index=1, key=f"{chave}_tamanho")
+    paginas = max(1, -(-total // tamanho))
+    chave_pagina = f"{chave}_pagina"
+    if st.session_state.get(chave_pagina, 1) > paginas:
+        st.session_state[chave_pagina] = paginas
+    pagina = st.sidebar.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina)
+    st.sidebar.caption(f"{paginas} página(s) · {total} chamado(s)")
+    return (int(pagina) - 1) * tamanho, tamanho
+
+def fatiar_pagina(df, inicio, tamanho):
+    """Só as linhas da página, com índice posicional (o "Nº" da visão é mantido)"""
+    return df.iloc[inicio:inicio + tamanho].reset_index(drop=True)
+
+def chave_editor(chave, inicio=None, tamanho=None, filtros=()):
+    """
+    Key do st.data_editor. As edições ficam guardadas por posição da linha, então a
+    key muda com a página e com os filtros: elas não podem ser reaplicadas às
+    linhas de outra visão.
+    """
+    partes = [chave, *map(str, filtros)]
+    if inicio is not None:
+        partes += [str(inicio), str(tamanho)]
+    return "_".join(partes)
+
+def visao_do_editor(editor, df):
+    """
+    Frame a exibir no editor `editor` e a usar ao salvar.
+
+    Enquanto houver edições pendentes, devolve o frame da rodada em que elas foram
+    feitas: o snapshot pode mudar entre rodadas (atualização em segundo plano,
+    mudanças em tempo real) e deslocar as linhas, e `edited_rows` só guarda posições.
+    """
+    visoes = st.session_state.setdefault("visoes_editor", {})
+    if st.session_state.get(editor, {}).get("edited_rows") and editor in visoes:
+        return visoes[editor]
+    # Frames de outros editores sem edições pendentes não precisam continuar guardados
+    for outro in [chave for chave in visoes if not st.session_state.get(chave, {}).get("edited_rows")]:
+        del visoes[outro]
+    visoes[editor] = df
+    return df
+
+def descartar_edicoes(editor):
+    """Esquece as edições do editor (após salvar) e volta a exibir o snapshot atual"""
+    st.session_state.pop(editor, None)
+    st.session_state.get("visoes_editor", {}).pop(editor, None)
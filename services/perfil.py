@@ -0,0 +1,55 @@
+import os
+import statistics
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Com CHAMADOS_PERFIL_INICIO=1 a barra lateral mostra o tempo de cada etapa da execução do script
+ATIVO = os.getenv("CHAMADOS_PERFIL_INICIO", "0") == "1"
+# Módulos pesados acompanhados no relatório (importados só quando alguma página precisa deles)
+MODULOS_PESADOS = ("pandas", "numpy", "supabase", "plotly", "pyarrow")
+# Tempo total das últimas execuções (por processo), por tela final ("login", "Chamados Pixeon", ...)
+_historico = {}
+
+class Cronometro:
+    """Marca o tempo de cada etapa de uma execução do script, desde a criação do cronômetro"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self._anterior = self.inicio
+
+    def marcar(self, etapa):
+        """Registra a etapa que terminou agora (duração desde a marca anterior)"""
+        agora = time.perf_counter()
+        self.etapas.append((etapa, agora - self._anterior, agora - self.inicio))
+        self._anterior = agora
+
+    @contextmanager
+    def medir(self, etapa):
+        """Mede só o bloco (ex.: a importação dos módulos de uma página)"""
+        self._anterior = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.marcar(etapa)
+
+    def exibir(self, tela):
+        """Fecha a execução e, com o perfil ativo, mostra o relatório na barra lateral"""
+        self.marcar(f"{tela} desenhada")
+        total = self.etapas[-1][2]
+        _historico.setdefault(tela, deque(maxlen=50)).append(total)
+        if not ATIVO:
+            return
+
+        import streamlit as st
+        linhas = [f"{etapa:<32} {duracao * 1000:8.1f} ms {acumulado * 1000:8.1f} ms"
+                  for etapa, duracao, acumulado in self.etapas]
+        carregados = [nome for nome in MODULOS_PESADOS if nome in sys.modules]
+        linhas.append("")
+        linhas.append(f"Módulos pesados carregados: {', '.join(carregados) or 'nenhum'}")
+        for nome, totais in _historico.items():
+            linhas.append(f"{nome}: mediana {statistics.median(totais) * 1000:.0f} ms em {len(totais)} execução(ões)")
+        with st.sidebar.expander("⏱️ Tempo de inicialização"):
+            st.code("\n".join(linhas), language=None)
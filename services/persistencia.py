@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+
+# Diretório dos snapshots em disco (Arrow IPC). Vazio desativa a persistência.
+DIRETORIO_SNAPSHOTS = os.getenv("CHAMADOS_SNAPSHOT_DIR", ".cache/snapshots")
+# Muda quando o formato do arquivo mudar; arquivos de outro formato são ignorados
+FORMATO = 1
+
+def _arrow():
+    # pyarrow é opcional: sem ele os snapshots simplesmente não vão para o disco
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        return pyarrow
+    except ImportError:
+        return None
+
+def caminho_snapshot(tabela, colunas):
+    """Arquivo do snapshot da tabela (as colunas entram no nome: cada consulta tem o seu)"""
+    nome = "".join(c if c.isalnum() else "_" for c in f"{tabela}__{colunas}")
+    return os.path.join(DIRETORIO_SNAPSHOTS, f"{nome}.arrow")
+
+def caminho_sincronizacao(tabela, colunas):
+    """Arquivo pequeno, ao lado do snapshot, com o último instante em que ele estava em dia"""
+    return f"{caminho_snapshot(tabela, colunas)}.sinc.json"
+
+def _json(valor):
+    return valor.item() if hasattr(valor, "item") else valor
+
+def salvar_snapshot(tabela, colunas, df, marca):
+    """
+    Grava os registros e a marca d'água num arquivo Arrow IPC (escrita atômica).
+    Devolve False se a persistência estiver desativada ou falhar.
+    """
+    pa = _arrow()
+    if pa is None or not DIRETORIO_SNAPSHOTS:
+        return False
+    caminho = caminho_snapshot(tabela, colunas)
+    metadados = {"formato": FORMATO, "tabela": tabela, "colunas": colunas, "marca": _json(marca), "salvo_em": time.time()}
+    try:
+        os.makedirs(DIRETORIO_SNAPSHOTS, exist_ok=True)
+        dados = pa.Table.from_pandas(df, preserve_index=False)
+        dados = dados.replace_schema_metadata({**(dados.schema.metadata or {}), b"chamados": json.dumps(metadados).encode()})
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, dados.schema) as escritor:
+            escritor.write_table(dados)
+        os.replace(temporario, caminho)
+        return True
+    except Exception:
+        return False
+
+def registrar_sincronizacao(tabela, colunas, sincronizado_em):
+    """
+    Registra que o snapshot gravado estava em dia no instante `sincronizado_em`
+    (time.time()) sem reescrever os registros: o arquivo só muda quando os dados
+    mudam, mas cada sincronização sem mudanças também o confirma.
+    """
+    if not DIRETORIO_SNAPSHOTS:
+        return False
+    caminho = caminho_snapshot(tabela, colunas)
+    try:
+        # Vale só para o arquivo atual: um snapshot regravado depois invalida o registro
+        conteudo = {"arquivo": os.stat(caminho).st_mtime_ns, "sincronizado_em": sincronizado_em}
+        temporario = f"{caminho_sincronizacao(tabela, colunas)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "w") as arquivo:
+            json.dump(conteudo, arquivo)
+        os.replace(temporario, caminho_sincronizacao(tabela, colunas))
+        return True
+    except Exception:
+        return False
+
+def _sincronizado_em(tabela, colunas, caminho):
+    try:
+        with open(caminho_sincronizacao(tabela, colunas)) as arquivo:
+            conteudo = json.load(arquivo)
+        if conteudo.get("arquivo") == os.stat(caminho).st_mtime_ns:
+            return conteudo.get("sincronizado_em")
+    except Exception:
+        pass
+    return None
+
+def carregar_snapshot(tabela, colunas):
+    """
+    Lê o snapshot salvo (mapeado em memória) e devolve (registros, marca, em_dia_em),
+    ou None se não houver arquivo válido para esta tabela e colunas. `em_dia_em`
+    (time.time()) é a última sincronização registrada, ou a gravação do arquivo.
+    """
+    pa = _arrow()
+    caminho = caminho_snapshot(tabela, colunas)
+    if pa is None or not DIRETORIO_SNAPSHOTS or not os.path.exists(caminho):
+        return None
+    try:
+        with pa.memory_map(caminho, "r") as arquivo:
+            dados = pa.ipc.open_file(arquivo).read_all()
+        metadados = json.loads((dados.schema.metadata or {}).get(b"chamados", b"{}"))
+        if metadados.get("formato") != FORMATO or metadados.get("tabela") != tabela or metadados.get("colunas") != colunas:
+            return None
+        em_dia_em = max(filter(None, [metadados.get("salvo_em"), _sincronizado_em(tabela, colunas, caminho)]), default=None)
+        return dados.to_pandas(), metadados.get("marca"), em_dia_em
+    except Exception:
+        return None
@@ -0,0 +1,370 @@
+import os
+import threading
+import time
+import pandas as pd
+from services.armazenamento import obter_backend
+from services.cache import invalidar_tabela, versao_tabela
+from services.persistencia import carregar_snapshot, salvar_snapshot, registrar_sincronizacao
+
+# Coluna usada como marca d'água da sincronização incremental.
+# Com "id" só chamados novos chegam no delta; com "updated_at" (se a tabela tiver)
+# edições feitas por outras pessoas também chegam.
+COLUNA_MARCA = os.getenv("SUPABASE_SYNC_COLUMN", "id")
+# Intervalo (segundos) da reconciliação completa, que é o que detecta exclusões
+INTERVALO_RECONCILIACAO = int(os.getenv("SUPABASE_SYNC_RECONCILE", 900))
+# A cada INTERVALO_ATUALIZACAO segundos a thread de fundo sincroniza a tabela.
+# Leitores recebem sempre o último snapshot válido; só esperam pela rede se ele
+# tiver mais de IDADE_MAXIMA segundos (ou se ainda não houver snapshot).
+INTERVALO_ATUALIZACAO = int(os.getenv("CHAMADOS_REFRESH_INTERVAL", 60))
+IDADE_MAXIMA = int(os.getenv("CHAMADOS_MAX_STALENESS", 300))
+
+class SincronizadorTabela:
+    """
+    Mantém em memória os registros de uma tabela (com os nomes de coluna do banco)
+    e os atualiza buscando apenas o que mudou desde a última marca d'água.
+    """
+
+    def __init__(self, tabela, colunas="*", coluna_marca=None, intervalo_reconciliacao=None,
+                 intervalo_atualizacao=None, idade_maxima=None):
+        self.tabela = tabela
+        self.coluna_marca = coluna_marca or COLUNA_MARCA
+        # A coluna da marca precisa vir na consulta, mesmo que a tela não a use
+        if colunas != "*" and self.coluna_marca not in [c.strip() for c in colunas.split(",")]:
+            colunas = f"{colunas}, {self.coluna_marca}"
+        self.colunas = colunas
+        self.intervalo_reconciliacao = intervalo_reconciliacao or INTERVALO_RECONCILIACAO
+        self.intervalo_atualizacao = intervalo_atualizacao or INTERVALO_ATUALIZACAO
+        self.idade_maxima = idade_maxima or IDADE_MAXIMA
+        self.df = None
+        self.versao = versao_tabela(tabela)
+        self.marca = None
+        self.ultima_reconciliacao = 0.0
+        self.atualizado_em = None
+        self.ultimo_erro = None
+        # _lock protege a troca do snapshot (rápido); _lock_atualizacao serializa as idas à rede
+        self._lock = threading.Lock()
+        self._lock_atualizacao = threading.Lock()
+        self._thread = None
+        self._ouvintes = []
+        # Verdadeiro enquanto um feed de mudanças em tempo real estiver conectado
+        self.tempo_real = False
+        # Versão já gravada em disco (para só regravar o snapshot quando ele mudar)
+        self.versao_salva = None
+        # atualizado_em já registrado ao lado do snapshot (registrar_sincronizacao)
+        self.registrado_em = None
+        # Registros mesclados durante uma ida à rede (None fora dela): a leitura pode
+        # ter começado antes da gravação, então eles são reaplicados por cima do resultado
+        self._mesclados = None
+
+    def obter(self, progresso=None):
+        """Devolve os registros atuais (o último snapshot válido)"""
+        return self.obter_snapshot(progresso)[0]
+
+    def atual(self):
+        """(registros, versão) do snapshot atual, sem ir à rede (registros None se não carregou)"""
+        with self._lock:
+            return self.df, self.versao
+
+    def obter_snapshot(self, progresso=None):
+        """
+        Devolve (registros, versão) de um mesmo snapshot.
+
+        Só bloqueia na primeira carga ou se o snapshot passou da idade máxima;
+        se apenas passou do intervalo de atualização, agenda uma atualização em
+        segundo plano e devolve o snapshot atual na hora.
+        """
+        if self._thread is None:
+            self.iniciar_atualizador()
+        if self.df is None and self._carregar_do_disco():
+            # Reinício: serve o snapshot do disco e o põe em dia em segundo plano
+            threading.Thread(target=self._recuperar_apos_disco, daemon=True).start()
+        idade = self.idade()
+        if idade is None or idade > self.idade_maxima:
+            self.atualizar(progresso)
+        elif idade > self.intervalo_atualizacao:
+            self.atualizar_em_segundo_plano()
+        with self._lock:
+            return self.df, self.versao
+
+    def idade(self):
+        """Idade do snapshot em segundos (None se ainda não carregou)"""
+        if self.atualizado_em is None:
+            return None
+        return time.monotonic() - self.atualizado_em
+
+    def atualizar(self, progresso=None):
+        """Sincroniza agora (delta ou carga completa). Falhas mantêm o último snapshot."""
+        pedido_em = time.monotonic()
+        with self._lock_atualizacao:
+            # Outra thread pode ter atualizado enquanto esta esperava
+            if self.atualizado_em is not None and self.atualizado_em >= pedido_em:
+                return
+            with self._lock:
+                self._mesclados = []
+            try:
+                if self.df is None or time.monotonic() - self.ultima_reconciliacao > self.intervalo_reconciliacao:
+                    self._carregar_completo(progresso)
+                else:
+                    self._sincronizar_delta(progresso)
+                self.atualizado_em = time.monotonic()
+                self.ultimo_erro = None
+            except Exception as e:
+                self.ultimo_erro = e
+                if self.df is None:
+                    raise
+            finally:
+                with self._lock:
+                    self._mesclados = None
+            self._persistir()
+
+    def atualizar_em_segundo_plano(self):
+        """Dispara uma atualização numa thread, se nenhuma estiver em andamento"""
+        if self._lock_atualizacao.locked():
+            return
+        threading.Thread(target=self._atualizar_silenciosamente, daemon=True).start()
+
+    def iniciar_atualizador(self):
+        """Inicia a thread que mantém a tabela sincronizada a cada intervalo_atualizacao"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._laco_atualizacao, daemon=True)
+        self._thread.start()
+
+    def _laco_atualizacao(self):
+        while True:
+            time.sleep(self.intervalo_atualizacao)
+            # Mudanças aplicadas por push também vão para o disco
+            self._persistir()
+            # Com o feed em tempo real conectado, só a reconciliação periódica vai à rede
+            if self.tempo_real and time.monotonic() - self.ultima_reconciliacao < self.intervalo_reconciliacao:
+                continue
+            self._atualizar_silenciosamente()
+
+    def marcar_em_dia(self):
+        """Registra que o snapshot está em dia sem ir à rede (ex.: feed em tempo real ativo)"""
+        if self.df is not None:
+            self.atualizado_em = time.monotonic()
+
+    def _atualizar_silenciosamente(self):
+        try:
+            self.atualizar()
+        except Exception as e:
+            self.ultimo_erro = e
+
+    def registrar_ouvinte(self, ouvinte):
+        """
+        Registra `ouvinte(antigos, novos, completo)`, chamado a cada mudança do snapshot.
+
+        `antigos` são as linhas substituídas e `novos` as que entraram (registros
+        crus, com os nomes do banco). Com `completo=True` o snapshot inteiro foi
+        trocado e quem mantém estruturas derivadas deve reconstruí-las.
+        Se já houver snapshot, o ouvinte é chamado na hora com ele (completo=True),
+        sem janela para perder mudanças entre o registro e a primeira notificação.
+        """
+        with self._lock:
+            self._ouvintes.append(ouvinte)
+            if self.df is not None:
+                ouvinte(None, self.df, True)
+
+    def _notificar(self, antigos, novos, completo):
+        # Chamado com self._lock adquirido; um ouvinte com erro não interrompe a sincronização
+        for ouvinte in self._ouvintes:
+            try:
+                ouvinte(antigos, novos, completo)
+            except Exception:
+                pass
+
+    def reconciliar(self):
+        """Força uma carga completa na próxima sincronização (ex.: após exclusões)"""
+        with self._lock:
+            self.ultima_reconciliacao = 0.0
+
+    def mesclar(self, registros):
+        """
+        Aplica localmente registros recém-gravados (retorno de insert/update).
+
+        A marca d'água não avança aqui: outras pessoas podem ter gravado linhas
+        abaixo dela que ainda não chegaram.
+        """
+        if not registros:
+            return
+        with self._lock:
+            if self._mesclados is not None:
+                self._mesclados.extend(registros)
+            if self.df is None:
+                return
+            self._aplicar(pd.DataFrame(registros))
+
+    def _carregar_do_disco(self):
+        """Assume o snapshot salvo em disco, se houver (só na primeira carga do processo)"""
+        with self._lock_atualizacao:
+            if self.df is not None:
+                return False
+            salvo = carregar_snapshot(self.tabela, self.colunas)
+            if salvo is None:
+                return False
+            df, marca, em_dia_em = salvo
+            with self._lock:
+                self.df = df
+                self.marca = marca
+                self.versao = invalidar_tabela(self.tabela)
+                self.versao_salva = self.versao
+                self._notificar(None, df, True)
+            # A recuperação abaixo já foi disparada; sem reconciliação imediata
+            self.ultima_reconciliacao = time.monotonic()
+            # A idade é a da última sincronização registrada em disco: um snapshot antigo
+            # ainda passa da idade máxima e obter_snapshot espera o delta (sem registro,
+            # como se não tivesse carregado)
+            if em_dia_em is None:
+                self.atualizado_em = None
+            else:
+                self.atualizado_em = time.monotonic() - max(0.0, time.time() - em_dia_em)
+            self.registrado_em = self.atualizado_em
+        return True
+
+    def _recuperar_apos_disco(self):
+        # Primeiro o delta (chamados novos aparecem logo), depois a reconciliação
+        # completa, que traz as exclusões feitas enquanto o processo estava parado
+        self._atualizar_silenciosamente()
+        self.reconciliar()
+        self._atualizar_silenciosamente()
+
+    def _persistir(self):
+        """
+        Grava o snapshot em disco se ele mudou desde a última gravação e registra
+        até quando ele está em dia (sincronizações sem mudanças não regravam os dados)
+        """
+        with self._lock:
+            df, marca, versao, atualizado_em = self.df, self.marca, self.versao, self.atualizado_em
+        if df is None:
+            return
+        if versao != self.versao_salva:
+            if not salvar_snapshot(self.tabela, self.colunas, df, marca):
+                return
+            self.versao_salva = versao
+        if atualizado_em is not None and atualizado_em != self.registrado_em:
+            em_dia_em = time.time() - (time.monotonic() - atualizado_em)
+            if registrar_sincronizacao(self.tabela, self.colunas, em_dia_em):
+                self.registrado_em = atualizado_em
+
+    def aplicar_mudancas(self, registros, ids_removidos):
+        """
+        Aplica mudanças recebidas por push: `registros` inseridos/alterados (linhas
+        completas) e `ids_removidos`. Como em mesclar, a marca d'água não avança.
+        """
+        with self._lock:
+            if self.df is None:
+                return
+            if registros:
+                self._aplicar(pd.DataFrame(registros))
+            if ids_removidos:
+                self._remover(ids_removidos)
+
+    def _remover(self, ids):
+        # Chamado com self._lock adquirido
+        if self.df.empty:
+            return
+        removidos = self.df["id"].isin(ids)
+        if not removidos.any():
+            return
+        antigos = self.df[removidos]
+        self.df = self.df[~removidos].reset_index(drop=True)
+        self.versao = invalidar_tabela(self.tabela)
+        self._notificar(antigos, self.df.iloc[0:0], False)
+
+    def _carregar_completo(self, progresso):
+        df = obter_backend().ler(self.tabela, self.colunas, progresso=progresso)
+        with self._lock:
+            # Reconciliação sem mudanças não precisa invalidar os caches derivados
+            if self.df is None or not self._mesmo_conteudo(df):
+                self.df = df
+                self.versao = invalidar_tabela(self.tabela)
+                self._notificar(None, df, True)
+            self.marca = self._marca_de(df)
+            self.ultima_reconciliacao = time.monotonic()
+            self._reaplicar_mesclados()
+
+    def _sincronizar_delta(self, progresso):
+        if self.marca is None:
+            self._carregar_completo(progresso)
+            return
+        # "id" só cresce; já "updated_at" pode repetir o mesmo instante, então usa gte
+        desde = (self.coluna_marca, self.marca, self.coluna_marca != "id")
+        novos = obter_backend().ler(self.tabela, self.colunas, desde=desde, progresso=progresso)
+        if novos.empty:
+            return
+        with self._lock:
+            self._aplicar(novos)
+            self.marca = max(self.marca, self._marca_de(novos))
+            self._reaplicar_mesclados()
+
+    def _aplicar(self, novos):
+        # Chamado com self._lock adquirido; troca o DataFrame em vez de alterá-lo,
+        # porque leitores podem estar usando o snapshot anterior
+        novos = novos[[coluna for coluna in novos.columns if coluna in self.df.columns or self.df.empty]]
+        novos = self._sem_repetidos(novos)
+        if novos.empty:
+            # Nada mudou (ex.: delta por updated_at com gte, eco da própria gravação):
+            # a versão fica como está e os caches derivados continuam valendo
+            return
+        if self.df.empty:
+            antigos = self.df
+            self.df = novos.reset_index(drop=True)
+        else:
+            substituidos = self.df["id"].isin(novos["id"])
+            antigos = self.df[substituidos]
+            self.df = pd.concat([self.df[~substituidos], novos], ignore_index=True)
+        self.versao = invalidar_tabela(self.tabela)
+        self._notificar(antigos, novos, False)
+
+    def _reaplicar_mesclados(self):
+        # Chamado com self._lock adquirido, depois de aplicar o que veio da rede
+        if self._mesclados:
+            self._aplicar(pd.DataFrame(self._mesclados))
+            self._mesclados = []
+
+    def _mesmo_conteudo(self, df):
+        """
+        True se `df` tem as mesmas linhas que o snapshot, em qualquer ordem.
+        Depois de mesclar/delta o snapshot tem outra ordem e outros dtypes (ex.:
+        object em vez de int), então a comparação é por id e valor a valor.
+        """
+        if len(df) != len(self.df) or set(df.columns) != set(self.df.columns):
+            return False
+        if df.empty:
+            return True
+        atuais = self.df.sort_values("id", kind="stable").reset_index(drop=True)[list(df.columns)]
+        recebidos = df.sort_values("id", kind="stable").reset_index(drop=True)
+        try:
+            iguais = (atuais == recebidos) | (atuais.isna() & recebidos.isna())
+        except TypeError:
+            return False
+        return bool(iguais.to_numpy().all())
+
+    def _sem_repetidos(self, novos):
+        """Tira de `novos` as linhas idênticas às que o snapshot já tem"""
+        if self.df.empty or novos.empty:
+            return novos
+        colunas = [coluna for coluna in novos.columns if coluna != "id"]
+        atuais = self.df.drop_duplicates("id", keep="last").set_index("id")
+        atuais = atuais.reindex(novos["id"])[colunas].reset_index(drop=True)
+        recebidos = novos[colunas].reset_index(drop=True)
+        iguais = ((atuais == recebidos) | (atuais.isna() & recebidos.isna())).all(axis=1).to_numpy()
+        return novos[~iguais]
+
+    def _marca_de(self, df):
+        if df.empty or self.coluna_marca not in df.columns:
+            return None
+        return df[self.coluna_marca].max()
+
+_sincronizadores = {}
+_lock_registro = threading.Lock()
+
+def obter_sincronizador(tabela, colunas="*"):
+    """Devolve o sincronizador compartilhado (por processo) da tabela/colunas"""
+    with _lock_registro:
+        chave = (tabela, colunas)
+        if chave not in _sincronizadores:
+            _sincronizadores[chave] = SincronizadorTabela(tabela, colunas)
+        return _sincronizadores[chave]
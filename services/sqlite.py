@@ -0,0 +1,292 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, time as dt_time
+from services.armazenamento import BackendArmazenamento, NAO_ENCONTRADO
+
+# Arquivo do banco local (CHAMADOS_BACKEND=sqlite)
+CAMINHO_SQLITE = os.getenv("CHAMADOS_SQLITE_PATH", "chamados.db")
+# Linhas por transação nas gravações em lote
+TAMANHO_LOTE = int(os.getenv("CHAMADOS_SQLITE_LOTE", 500))
+# Limite de parâmetros por comando (SQLITE_MAX_VARIABLE_NUMBER das versões antigas)
+MAX_PARAMETROS = 900
+
+# Colunas de cada tabela, além de "id" e "updated_at" (as mesmas do Supabase)
+ESQUEMAS = {
+    "Chamados": {
+        "chamados_sh": "INTEGER",
+        "chamados_px": "TEXT",
+        "titulo": "TEXT",
+        "data_abertura": "TEXT",
+        "pendencia_retorno": "TEXT",
+        "usuario_resp": "TEXT",
+        "status": "TEXT",
+        "observacao": "TEXT",
+    },
+    "Chamados_fc": {
+        "chamado_sd": "INTEGER",
+        "chamado_facil": "TEXT",
+        "titulo": "TEXT",
+        "data_abertura": "TEXT",
+        "pendencia_retorno": "TEXT",
+        "usuario_resp": "TEXT",
+        "status": "TEXT",
+        "observacao": "TEXT",
+    },
+}
+AGORA = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+def _q(nome):
+    """Identificador entre aspas (nomes vêm do código, mas "Chamados" tem maiúscula)"""
+    return '"' + nome.replace('"', '""') + '"'
+
+def _valor(valor):
+    """Escalares do pandas/numpy e datas para tipos aceitos pelo sqlite3"""
+    if valor is None:
+        return None
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and valor != valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date().isoformat() if valor.time() == dt_time() else valor.isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+class BackendSQLite(BackendArmazenamento):
+    """
+    Chamados num arquivo SQLite local: sem rede, para rodar offline, medir sem ruído
+    e servir leituras de uma réplica local.
+
+    Uma conexão por thread, em modo WAL (leitores não bloqueiam o escritor) e com
+    índices em status, pendencia_retorno e (data_abertura, id). Os comandos são
+    sempre parametrizados com texto fixo, então o cache de comandos preparados do
+    sqlite3 os reaproveita. A pesquisa usa LIKE, que ignora maiúsculas só em ASCII.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or CAMINHO_SQLITE
+        self._local = threading.local()
+        self.criar_esquema()
+
+    def conexao(self):
+        """Conexão da thread atual (criada na primeira chamada)"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, isolation_level=None, cached_statements=256, timeout=30)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def criar_esquema(self):
+        conexao = self.conexao()
+        for tabela, colunas in ESQUEMAS.items():
+            definicoes = ", ".join(f"{_q(coluna)} {tipo}" for coluna, tipo in colunas.items())
+            conexao.execute(
+                f"CREATE TABLE IF NOT EXISTS {_q(tabela)} (id INTEGER PRIMARY KEY, {definicoes}, "
+                f"updated_at TEXT NOT NULL DEFAULT ({AGORA}))"
+            )
+            for nome, indice in (("status", "status"), ("pendencia", "pendencia_retorno"),
+                                 ("data", "data_abertura, id"), ("updated_at", "updated_at")):
+                conexao.execute(f"CREATE INDEX IF NOT EXISTS {_q(f'idx_{tabela}_{nome}')} ON {_q(tabela)} ({indice})")
+            # Mantém updated_at em dia para a sincronização incremental por essa coluna
+            conexao.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {_q(f'tg_{tabela}_updated_at')} AFTER UPDATE ON {_q(tabela)} "
+                f"WHEN NEW.updated_at = OLD.updated_at BEGIN "
+                f"UPDATE {_q(tabela)} SET updated_at = {AGORA} WHERE id = NEW.id; END"
+            )
+
+    def _colunas(self, tabela, colunas):
+        validas = ["id", *ESQUEMAS[tabela], "updated_at"]
+        if colunas == "*":
+            return validas
+        pedidas = [coluna.strip() for coluna in colunas.split(",")]
+        desconhecidas = [coluna for coluna in pedidas if coluna not in validas]
+        if desconhecidas:
+            raise ValueError(f"Colunas desconhecidas em {tabela}: {', '.join(desconhecidas)}")
+        return pedidas
+
+    def _onde(self, igual, termo, busca):
+        condicoes, parametros = [], []
+        for coluna, valor in (igual or {}).items():
+            condicoes.append(f"{_q(coluna)} = ?")
+            parametros.append(_valor(valor))
+        if termo and busca:
+            padrao = "%" + str(termo).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            alternativas = [f"{_q(coluna)} LIKE ? ESCAPE '\\'" for coluna in busca["texto"]]
+            parametros += [padrao] * len(busca["texto"])
+            if str(termo).strip().isdigit():
+                alternativas += [f"{_q(coluna)} = ?" for coluna in busca["numero"]]
+                parametros += [int(termo)] * len(busca["numero"])
+            condicoes.append("(" + " OR ".join(alternativas) + ")")
+        return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", parametros
+
+    def ler(self, tabela, colunas="*", desde=None, progresso=None):
+        import pandas as pd
+        nomes = self._colunas(tabela, colunas)
+        onde, parametros = "", []
+        if desde is not None:
+            coluna, valor, inclusivo = desde
+            onde, parametros = f" WHERE {_q(coluna)} {'>=' if inclusivo else '>'} ?", [_valor(valor)]
+        cursor = self.conexao().execute(
+            f"SELECT {', '.join(map(_q, nomes))} FROM {_q(tabela)}{onde} ORDER BY data_abertura, id", parametros
+        )
+        # Leitura local é rápida o bastante para dispensar a barra de progresso
+        linhas = [tuple(linha) for linha in cursor.fetchall()]
+        return pd.DataFrame.from_records(linhas, columns=nomes) if linhas else pd.DataFrame()
+
+    def iterar(self, tabela, colunas="*", tamanho_lote=1000):
+        nomes = self._colunas(tabela, colunas)
+        # O cursor fica aberto entre os lotes; em WAL a leitura vê um retrato fixo da tabela
+        cursor = self.conexao().execute(f"SELECT {', '.join(map(_q, nomes))} FROM {_q(tabela)} ORDER BY data_abertura, id")
+        try:
+            while True:
+                linhas = cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    return
+                yield [dict(linha) for linha in linhas]
+        finally:
+            cursor.close()
+
+    def contar(self, tabela, igual=None, termo="", busca=None):
+        onde, parametros = self._onde(igual, termo, busca)
+        return self.conexao().execute(f"SELECT count(*) FROM {_q(tabela)}{onde}", parametros).fetchone()[0]
+
+    def consultar(self, tabela, colunas="*", igual=None, termo="", busca=None, inicio=0, tamanho=100):
+        nomes = self._colunas(tabela, colunas)
+        onde, parametros = self._onde(igual, termo, busca)
+        cursor = self.conexao().execute(
+            f"SELECT {', '.join(map(_q, nomes))} FROM {_q(tabela)}{onde} ORDER BY data_abertura, id LIMIT ? OFFSET ?",
+            [*parametros, int(tamanho), int(inicio)],
+        )
+        return [dict(linha) for linha in cursor.fetchall()]
+
+    def agrupar(self, tabela, colunas):
+        lista = ", ".join(map(_q, colunas))
+        cursor = self.conexao().execute(f"SELECT {lista}, count(*) AS count FROM {_q(tabela)} GROUP BY {lista}")
+        return [dict(linha) for linha in cursor.fetchall()]
+
+    def inserir(self, tabela, registro):
+        colunas = [coluna for coluna in registro if coluna in ESQUEMAS[tabela]]
+        cursor = self.conexao().execute(
+            f"INSERT INTO {_q(tabela)} ({', '.join(map(_q, colunas))}) VALUES ({', '.join('?' * len(colunas))}) RETURNING *",
+            [_valor(registro[coluna]) for coluna in colunas],
+        )
+        return [dict(linha) for linha in cursor.fetchall()]
+
+    def inserir_em_lote(self, tabela, registros):
+        colunas = [coluna for coluna in (registros[0] if registros else {}) if coluna in ESQUEMAS[tabela]]
+        linhas = [[_valor(registro[coluna]) for coluna in colunas] for registro in registros]
+        if linhas:
+            self._transacao(lambda: self.conexao().executemany(
+                f"INSERT INTO {_q(tabela)} ({', '.join(map(_q, colunas))}) VALUES ({', '.join('?' * len(colunas))})",
+                linhas,
+            ))
+        return len(linhas)
+
+    def _atualizar(self, tabela, dados, ids):
+        """UPDATE com o mesmo conteúdo para vários ids; devolve os ids que existiam"""
+        atribuicoes = ", ".join(f"{_q(coluna)} = ?" for coluna in dados)
+        encontrados = []
+        passo = MAX_PARAMETROS - len(dados)
+        for inicio in range(0, len(ids), passo):
+            parte = ids[inicio:inicio + passo]
+            cursor = self.conexao().execute(
+                f"UPDATE {_q(tabela)} SET {atribuicoes} WHERE id IN ({', '.join('?' * len(parte))}) RETURNING id",
+                [*dados.values(), *parte],
+            )
+            encontrados.extend(linha[0] for linha in cursor.fetchall())
+        return encontrados
+
+    def _transacao(self, funcao):
+        conexao = self.conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            funcao()
+        except Exception:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+
+    def _linhas_por_id(self, tabela, ids):
+        linhas = []
+        for inicio in range(0, len(ids), MAX_PARAMETROS):
+            parte = ids[inicio:inicio + MAX_PARAMETROS]
+            cursor = self.conexao().execute(
+                f"SELECT * FROM {_q(tabela)} WHERE id IN ({', '.join('?' * len(parte))})", parte
+            )
+            linhas.extend(dict(linha) for linha in cursor.fetchall())
+        return linhas
+
+    def salvar_em_lote(self, tabela, alteracoes, tudo_ou_nada=False):
+        # Alterações com o mesmo conteúdo viram um só UPDATE ... WHERE id IN (...)
+        grupos = {}
+        for alteracao in alteracoes:
+            dados = {coluna: _valor(valor) for coluna, valor in alteracao["data"].items()}
+            grupos.setdefault(tuple(sorted(dados.items())), (dados, []))[1].append(_valor(alteracao["id"]))
+        ids = [id_ for _, ids_grupo in grupos.values() for id_ in ids_grupo]
+
+        if tudo_ou_nada:
+            ausentes = []
+
+            def gravar():
+                for dados, ids_grupo in grupos.values():
+                    encontrados = set(self._atualizar(tabela, dados, ids_grupo))
+                    ausentes.extend(id_ for id_ in ids_grupo if id_ not in encontrados)
+                if ausentes:
+                    # Desfaz a transação: nenhum chamado é gravado
+                    raise LookupError(NAO_ENCONTRADO)
+
+            try:
+                self._transacao(gravar)
+            except LookupError:
+                return [], [(id_, NAO_ENCONTRADO) for id_ in ausentes]
+            except Exception as e:
+                return [], [(id_, str(e)) for id_ in ids]
+            return self._linhas_por_id(tabela, ids), []
+
+        gravados, erros = [], []
+        for dados, ids_grupo in grupos.values():
+            for inicio in range(0, len(ids_grupo), TAMANHO_LOTE):
+                lote = ids_grupo[inicio:inicio + TAMANHO_LOTE]
+                falharam = set()
+                encontrados = []
+                try:
+                    self._transacao(lambda: encontrados.extend(self._atualizar(tabela, dados, lote)))
+                except Exception:
+                    # Lote recusado: regrava linha a linha para salvar as válidas
+                    encontrados = []
+                    for id_ in lote:
+                        try:
+                            self._transacao(lambda: encontrados.extend(self._atualizar(tabela, dados, [id_])))
+                        except Exception as e:
+                            falharam.add(id_)
+                            erros.append((id_, str(e)))
+                gravados.extend(encontrados)
+                faltaram = set(lote) - set(encontrados) - falharam
+                erros.extend((id_, NAO_ENCONTRADO) for id_ in lote if id_ in faltaram)
+        return self._linhas_por_id(tabela, gravados), erros
+
+    def replicar(self, tabela, df):
+        """Substitui o conteúdo da tabela pelos registros de `df` (ex.: cópia do Supabase)"""
+        colunas = [coluna for coluna in ["id", *ESQUEMAS[tabela], "updated_at"] if coluna in df.columns]
+        linhas = [[_valor(valor) for valor in linha] for linha in df[colunas].itertuples(index=False, name=None)]
+
+        def copiar():
+            self.conexao().execute(f"DELETE FROM {_q(tabela)}")
+            self.conexao().executemany(
+                f"INSERT INTO {_q(tabela)} ({', '.join(map(_q, colunas))}) VALUES ({', '.join('?' * len(colunas))})",
+                linhas,
+            )
+        self._transacao(copiar)
+        return len(linhas)
+
+if __name__ == "__main__":
+    # Copia as tabelas do Supabase para o arquivo local: python -m services.sqlite
+    from services.armazenamento import BackendSupabase
+    origem, destino = BackendSupabase(), BackendSQLite()
+    for tabela in ESQUEMAS:
+        print(f"{tabela}: {destino.replicar(tabela, origem.ler(tabela))} linha(s) copiada(s) para {destino.caminho}")
@@ -1,66 +1,358 @@
+import json
 import os
-from supabase import create_client, Client
-import pandas as pd
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
+from services.armazenamento import NAO_ENCONTRADO
 
 # Obter as variáveis de ambiente
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Chave opcional do cliente compartilhado de leitura (ex.: service role). Esse cliente nunca
+# recebe a sessão de um usuário; sem a variável ele usa a SUPABASE_KEY, como antes, e as
+# tabelas precisam de uma política RLS de leitura para anon. A service role ignora o RLS:
+# fica só no servidor e nunca vai em URLs (ver services/tempo_real.py). Ver .env.example.
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+CHAVE_LEITURA = SUPABASE_SERVICE_KEY or SUPABASE_KEY
+# Máximo de clientes autenticados (um por sessão) mantidos no processo
+MAX_CLIENTES_SESSAO = int(os.getenv("SUPABASE_SESSION_CLIENTS", 64))
 
-# Verificar se as variáveis estão configuradas
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("As variáveis de ambiente SUPABASE_URL e SUPABASE_KEY não estão configuradas.")
+def _criar_cliente(chave):
+    # A configuração só é exigida quando um cliente é criado: com o backend SQLite
+    # as telas de chamados funcionam sem Supabase
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("As variáveis de ambiente SUPABASE_URL e SUPABASE_KEY não estão configuradas.")
+    from supabase import create_client
+    return create_client(SUPABASE_URL, chave)
 
-# Criar cliente Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Cliente Supabase criado no primeiro uso: a tela de login não paga a importação
+# do pacote supabase (nem a do pandas, importado só pelas funções que montam frames)
+_cliente = None
+_lock_cliente = threading.Lock()
 
-st.cache_data(ttl=300) 
-def carregar_chamados():
-    """Função para carregar os chamados do banco de dados"""
+def obter_cliente():
+    """
+    Cliente compartilhado do processo, só para leituras que não dependem do usuário
+    (snapshots, contagens, agregados). Nunca recebe a sessão de ninguém.
+    """
+    global _cliente
+    if _cliente is None:
+        with _lock_cliente:
+            if _cliente is None:
+                _cliente = _criar_cliente(CHAVE_LEITURA)
+    return _cliente
+
+# Clientes autenticados: um por sessão do Streamlit, para o set_session de um usuário
+# não trocar o de outro. Cada cliente mantém suas próprias conexões HTTP (keep-alive);
+# no logout o cliente é limpo e volta para _clientes_livres, para a próxima sessão.
+_clientes_sessao = OrderedDict()
+_clientes_livres = []
+_lock_sessoes = threading.Lock()
+
+def cliente_sessao(id_sessao):
+    """Cliente da sessão `id_sessao` (reaproveita um livre ou cria um novo)"""
+    with _lock_sessoes:
+        if id_sessao in _clientes_sessao:
+            _clientes_sessao.move_to_end(id_sessao)
+            return _clientes_sessao[id_sessao]
+        cliente = _clientes_livres.pop() if _clientes_livres else None
+    if cliente is None:
+        cliente = _criar_cliente(SUPABASE_KEY)
+    with _lock_sessoes:
+        _clientes_sessao[id_sessao] = cliente
+        # Sessões fechadas sem logout: o cliente menos usado é descartado sem sign_out,
+        # que revogaria o refresh token guardado no cookie do usuário
+        while len(_clientes_sessao) > MAX_CLIENTES_SESSAO:
+            _clientes_sessao.popitem(last=False)
+    return cliente
+
+def liberar_cliente_sessao(id_sessao, access_token=None):
+    """Faz o sign_out da sessão e devolve o cliente (com suas conexões) para reaproveitamento"""
+    with _lock_sessoes:
+        cliente = _clientes_sessao.pop(id_sessao, None)
+    if cliente is None:
+        return
     try:
-        response = supabase.table("Chamados").select("*").execute()
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df.rename(columns={
-                "chamados_sh": "Chamados SH",
-                "chamados_px": "Chamados Pixeon",
-                "titulo": "Título",
-                "data_abertura": "Data",
-                "pendencia_retorno": "Pendência",
-                "usuario_resp": "Usuário Resp",
-                "status": "Status",
-                "observacao": "Observação",
-            }, inplace=True)
-            return df
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro ao carregar os chamados: {e}")
+        # Sessão restaurada só com o token (validado localmente): o auth não a conhece,
+        # então a revogação no servidor é feita com o próprio token
+        if access_token and cliente.auth.get_session() is None:
+            cliente.auth.admin.sign_out(access_token, "local")
+        cliente.auth.sign_out({"scope": "local"})
+    except Exception:
+        # Sem conseguir limpar a sessão, o cliente não pode ir para outro usuário
+        return
+    with _lock_sessoes:
+        if len(_clientes_livres) < MAX_CLIENTES_SESSAO:
+            _clientes_livres.append(cliente)
+
+def cliente_da_sessao():
+    """Cliente autenticado da sessão atual do Streamlit (login, logout e gravações)"""
+    if "id_cliente_supabase" not in st.session_state:
+        st.session_state["id_cliente_supabase"] = uuid.uuid4().hex
+    return cliente_sessao(st.session_state["id_cliente_supabase"])
+
+def sessao_tem_cliente():
+    """Se a sessão atual ainda tem cliente próprio (pode ter sido descartado por falta de uso)"""
+    with _lock_sessoes:
+        return st.session_state.get("id_cliente_supabase") in _clientes_sessao
+
+def autenticar_com_token(access_token):
+    """Usa um access token já validado nas consultas da sessão, sem ida ao servidor de autenticação"""
+    cliente_da_sessao().postgrest.auth(access_token)
+
+def encerrar_sessao(access_token=None):
+    """Libera o cliente da sessão atual (logout)"""
+    id_sessao = st.session_state.pop("id_cliente_supabase", None)
+    if id_sessao is not None:
+        liberar_cliente_sessao(id_sessao, access_token)
+
+def __getattr__(nome):
+    # Mantém `from services.supabase import supabase` funcionando, sem criar o cliente na importação
+    if nome == "supabase":
+        return obter_cliente()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+# Leitura paginada: o PostgREST corta cada resposta em 1000 linhas
+TAMANHO_PAGINA = int(os.getenv("SUPABASE_PAGE_SIZE", 1000))
+PAGINAS_PARALELAS = int(os.getenv("SUPABASE_PAGE_WORKERS", 4))
+
+def _buscar_janela(tabela, colunas, ordem, inicio, fim, filtro=None):
+    """Busca as linhas [inicio, fim] da tabela, completando a janela se o servidor cortar a resposta"""
+    registros = []
+    while inicio <= fim:
+        consulta = obter_cliente().table(tabela).select(colunas)
+        if filtro:
+            consulta = filtro(consulta)
+        for coluna in ordem:
+            consulta = consulta.order(coluna, desc=False)
+        response = consulta.range(inicio, fim).execute()
+        if not response.data:
+            break
+        registros.extend(response.data)
+        inicio += len(response.data)
+    return registros
+
+def buscar_paginado(tabela, colunas="*", ordem=("data_abertura", "id"), tamanho_pagina=None, progresso=None, filtro=None):
+    """
+    Lê a tabela inteira em janelas de tamanho fixo e monta o DataFrame pedaço a pedaço.
+
+    A primeira janela traz também a contagem total de linhas; as demais são
+    buscadas em paralelo (até PAGINAS_PARALELAS de cada vez). Se informado,
+    `progresso(linhas_lidas, total)` é chamado a cada janela recebida.
+    `filtro`, se informado, recebe a consulta e devolve a consulta filtrada
+    (ex.: `lambda q: q.gt("id", 100)`).
+    """
+    import pandas as pd
+    tamanho_pagina = tamanho_pagina or TAMANHO_PAGINA
+
+    consulta = obter_cliente().table(tabela).select(colunas, count="exact")
+    if filtro:
+        consulta = filtro(consulta)
+    for coluna in ordem:
+        consulta = consulta.order(coluna, desc=False)
+    response = consulta.range(0, tamanho_pagina - 1).execute()
+    primeira = response.data or []
+    total = response.count if response.count is not None else len(primeira)
+
+    # O servidor pode devolver menos linhas que o pedido; o restante da janela vem depois
+    if primeira and len(primeira) < min(tamanho_pagina, total):
+        primeira.extend(_buscar_janela(tabela, colunas, ordem, len(primeira), tamanho_pagina - 1, filtro))
+
+    pedacos = {0: pd.DataFrame(primeira)}
+    lidas = len(primeira)
+    if progresso:
+        progresso(lidas, total)
+
+    inicios = range(tamanho_pagina, total, tamanho_pagina)
+    if inicios:
+        with ThreadPoolExecutor(max_workers=PAGINAS_PARALELAS) as executor:
+            futuros = {
+                executor.submit(_buscar_janela, tabela, colunas, ordem, inicio, inicio + tamanho_pagina - 1, filtro): inicio
+                for inicio in inicios
+            }
+            for futuro in as_completed(futuros):
+                registros = futuro.result()
+                pedacos[futuros[futuro]] = pd.DataFrame(registros)
+                lidas += len(registros)
+                if progresso:
+                    progresso(lidas, total)
+
+    pedacos = [pedacos[inicio] for inicio in sorted(pedacos) if not pedacos[inicio].empty]
+    if not pedacos:
         return pd.DataFrame()
-    
-@st.cache_data(ttl=300) 
-def carregar_chamados_fc():
-    """Função para carregar os chamados do banco de dados"""
+    return pd.concat(pedacos, ignore_index=True)
+
+def iterar_paginas(tabela, colunas="*", ordem=("data_abertura", "id"), tamanho_pagina=None):
+    """
+    Gera a tabela janela a janela (listas de registros), uma requisição por vez:
+    só uma janela fica em memória, ao contrário de buscar_paginado.
+    """
+    tamanho_pagina = tamanho_pagina or TAMANHO_PAGINA
+    inicio = 0
+    while True:
+        registros = _buscar_janela(tabela, colunas, ordem, inicio, inicio + tamanho_pagina - 1)
+        if registros:
+            yield registros
+        if len(registros) < tamanho_pagina:
+            return
+        inicio += len(registros)
+
+# Linhas por chamada de gravação em lote (e IDs por filtro id=in.(...), que vão na URL)
+TAMANHO_LOTE_GRAVACAO = int(os.getenv("SUPABASE_UPSERT_BATCH", 500))
+# Função que grava um lote com um único UPDATE (nunca recria um chamado excluído) e que
+# faz o "tudo ou nada" numa transação. Sem ela, o "tudo ou nada" não fica disponível.
+#   create function salvar_chamados(tabela text, linhas jsonb, tudo_ou_nada boolean default false)
+#   returns jsonb language plpgsql as $$
+#   declare colunas text; salvos jsonb; ausentes jsonb;
+#   begin
+#     select string_agg(format('%I = l.%I', k, k), ', ') into colunas
+#       from jsonb_object_keys(linhas -> 0) k where k <> 'id';
+#     execute format('with feitos as (update %I t set %s from jsonb_populate_recordset(null::%I, $1) l
+#       where t.id = l.id returning t.*) select coalesce(jsonb_agg(to_jsonb(feitos)), ''[]'') from feitos',
+#       tabela, colunas, tabela) into salvos using linhas;
+#     if tudo_ou_nada and jsonb_array_length(salvos) < jsonb_array_length(linhas) then
+#       select jsonb_agg(l -> 'id') into ausentes from jsonb_array_elements(linhas) l
+#         where not exists (select 1 from jsonb_array_elements(salvos) s where s -> 'id' = l -> 'id');
+#       raise exception 'Chamados não encontrados' using errcode = 'P0002', detail = ausentes::text;
+#     end if;
+#     return salvos;
+#   end $$;
+SALVAR_RPC = os.getenv("CHAMADOS_SALVAR_RPC", "")
+
+def _valor_json(valor):
+    """Converte escalares do pandas/numpy para tipos aceitos no JSON da requisição"""
+    import pandas as pd
+    if valor is None:
+        return None
+    if hasattr(valor, "item"):
+        valor = valor.item()
     try:
-        response = supabase.table("Chamados_fc").select("*").execute()
-        if response.data:
-            df = pd.DataFrame(response.data)
-            df.rename(columns={
-                "chamado_sd": "Chamados SH",
-                "chamado_facil": "Chamados Fácil",
-                "titulo": "Título",
-                "data_abertura": "Data",
-                "pendencia_retorno": "Pendência",
-                "usuario_resp": "Usuário Resp",
-                "status": "Status",
-                "observacao": "Observação",
-            }, inplace=True)
-
-            # Formatação opcional
-            df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-            return df
-        else:
-            st.warning("Nenhum dado retornado da tabela Chamados_fc.")
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro ao carregar chamados Fácil: {str(e)}")
-        return pd.DataFrame()
+        if pd.isnull(valor):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return valor
+
+def _atualizar(tabela, dados, ids, cliente=None):
+    response = (cliente or obter_cliente()).table(tabela).update(dados).in_("id", ids).execute()
+    return response.data or []
+
+def _upsert(tabela, linhas, cliente=None):
+    response = (cliente or obter_cliente()).table(tabela).upsert(linhas, on_conflict="id").execute()
+    return response.data or []
+
+def _salvar_rpc(tabela, linhas, tudo_ou_nada, cliente=None):
+    response = (cliente or obter_cliente()).rpc(SALVAR_RPC, {"tabela": tabela, "linhas": linhas, "tudo_ou_nada": tudo_ou_nada}).execute()
+    return response.data or []
+
+def _gravar_lote(tabela, linhas, cliente=None):
+    """Grava numa chamada linhas com as mesmas colunas; devolve só as que existiam"""
+    ids = [linha["id"] for linha in linhas]
+    dados = [{coluna: valor for coluna, valor in linha.items() if coluna != "id"} for linha in linhas]
+    if all(item == dados[0] for item in dados):
+        # Mesmo conteúdo (ex.: vários chamados concluídos de uma vez): um update só
+        return _atualizar(tabela, dados[0], ids, cliente)
+    if SALVAR_RPC:
+        return _salvar_rpc(tabela, linhas, False, cliente)
+    # Sem a função: upsert só dos IDs que existem. Um chamado excluído entre a
+    # consulta e o upsert ainda seria recriado; a função fecha essa janela
+    existentes = _ids_existentes(tabela, ids, cliente)
+    linhas = [linha for linha in linhas if linha["id"] in existentes]
+    return _upsert(tabela, linhas, cliente) if linhas else []
+
+def _ids_existentes(tabela, ids, cliente=None):
+    existentes = set()
+    for inicio in range(0, len(ids), TAMANHO_LOTE_GRAVACAO):
+        response = (cliente or obter_cliente()).table(tabela).select("id").in_("id", ids[inicio:inicio + TAMANHO_LOTE_GRAVACAO]).execute()
+        existentes.update(linha["id"] for linha in response.data or [])
+    return existentes
+
+def salvar_em_lote(tabela, alteracoes, tamanho_lote=None, tudo_ou_nada=False, cliente=None):
+    """
+    Grava alterações de chamados existentes, em poucas chamadas.
+
+    `alteracoes` segue o formato das telas: [{"id": ..., "data": {...}}, ...], com as
+    linhas completas (montar_alteracoes com `completar`). As linhas são agrupadas pelas
+    colunas e gravadas em lotes de `tamanho_lote`, uma chamada por lote: um update
+    quando o conteúdo é o mesmo, senão a função SALVAR_RPC ou um upsert dos IDs que
+    existem. Um chamado excluído por outra pessoa não é recriado: ele volta como erro.
+
+    Cada chamada ao PostgREST roda numa transação, então:
+    - com `tudo_ou_nada`, tudo vai numa única chamada à SALVAR_RPC (obrigatória) e,
+      se algo falhar ou algum chamado não existir mais, nada é gravado;
+    - sem ele, os lotes são independentes e, se um lote falhar, seus chamados são
+      regravados um a um (update) para salvar os válidos e apontar os que falharam.
+
+    `cliente` é o cliente autenticado que grava (padrão: o compartilhado).
+
+    Retorna (registros_salvos, erros), com erros no formato [(id, mensagem), ...].
+    """
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_GRAVACAO
+
+    # {colunas: [linhas]}
+    grupos = {}
+    for alteracao in alteracoes:
+        linha = {coluna: _valor_json(valor) for coluna, valor in alteracao["data"].items()}
+        linha["id"] = _valor_json(alteracao["id"])
+        grupos.setdefault(tuple(sorted(linha)), []).append(linha)
+    ids = [linha["id"] for linhas in grupos.values() for linha in linhas]
+
+    if tudo_ou_nada:
+        if not SALVAR_RPC:
+            return [], [(id_, "Gravação \"tudo ou nada\" indisponível: configure CHAMADOS_SALVAR_RPC.") for id_ in ids]
+        if len(grupos) > 1:
+            return [], [(id_, "As alterações têm colunas diferentes e não podem ser gravadas numa única transação.") for id_ in ids]
+        try:
+            return _salvar_rpc(tabela, next(iter(grupos.values())), True, cliente), []
+        except Exception as e:
+            if getattr(e, "code", None) == "P0002":
+                try:
+                    return [], [(id_, NAO_ENCONTRADO) for id_ in json.loads(e.details)]
+                except (TypeError, ValueError):
+                    pass
+            return [], [(id_, str(e)) for id_ in ids]
+
+    salvos, erros = [], []
+    for linhas in grupos.values():
+        for inicio in range(0, len(linhas), tamanho_lote):
+            lote = linhas[inicio:inicio + tamanho_lote]
+            falharam = set()
+            try:
+                gravados = _gravar_lote(tabela, lote, cliente)
+            except Exception:
+                gravados = []
+                for linha in lote:
+                    dados = {coluna: valor for coluna, valor in linha.items() if coluna != "id"}
+                    try:
+                        gravados.extend(_atualizar(tabela, dados, [linha["id"]], cliente))
+                    except Exception as e:
+                        falharam.add(linha["id"])
+                        erros.append((linha["id"], str(e)))
+            salvos.extend(gravados)
+            encontrados = {gravado.get("id") for gravado in gravados}
+            erros.extend((linha["id"], NAO_ENCONTRADO) for linha in lote
+                         if linha["id"] not in encontrados and linha["id"] not in falharam)
+    return salvos, erros
+
+def barra_progresso(texto):
+    """
+    Devolve o callback de progresso usado por buscar_paginado.
+
+    A barra só é criada quando há leitura de fato (quem usa o snapshot em memória
+    não vê barra nenhuma).
+    """
+    barra = None
+
+    def atualizar(lidas, total):
+        nonlocal barra
+        if total == 0 or lidas >= total:
+            if barra is not None:
+                barra.empty()
+            return
+        if barra is None:
+            barra = st.progress(0.0, text=texto)
+        barra.progress(lidas / total, text=f"{texto} ({lidas}/{total})")
+
+    return atualizar
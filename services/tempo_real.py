@@ -0,0 +1,176 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+# Feed de mudanças do Supabase Realtime (protocolo Phoenix sobre websocket).
+# Para usar, a tabela precisa estar na publicação supabase_realtime do projeto;
+# sem isso o join é recusado e a sincronização continua por consulta periódica.
+ATIVO = os.getenv("SUPABASE_REALTIME", "1") == "1"
+# Endereço do websocket; por padrão derivado de SUPABASE_URL (https://x.supabase.co -> wss://...)
+URL_REALTIME = os.getenv("SUPABASE_REALTIME_URL", "")
+ESQUEMA = os.getenv("SUPABASE_REALTIME_SCHEMA", "public")
+# O servidor derruba a conexão sem heartbeat em ~60 s
+INTERVALO_HEARTBEAT = 25
+# Espera máxima (segundos) entre tentativas de reconexão
+ESPERA_MAXIMA = 300
+# Mudanças que chegam juntas são aplicadas num único lote (uma troca de snapshot)
+TAMANHO_LOTE = 500
+
+def url_realtime(url_supabase):
+    """
+    Endereço do websocket do Realtime para o projeto. A chave não entra na URL (iria
+    para logs de proxies e do servidor): vai nos cabeçalhos da conexão (cabecalhos_realtime).
+    """
+    base = URL_REALTIME or url_supabase.rstrip("/").replace("https://", "wss://").replace("http://", "ws://") + "/realtime/v1/websocket"
+    separador = "&" if "?" in base else "?"
+    return f"{base}{separador}vsn=1.0.0"
+
+def cabecalhos_realtime(chave):
+    """Cabeçalhos com a chave: "apikey" para o gateway do Supabase e "x-api-key" para o Realtime"""
+    return {"apikey": chave, "x-api-key": chave}
+
+def compactar_mudancas(mudancas):
+    """
+    Reduz uma sequência de mudanças (tipo, registro, registro_antigo) à última de cada
+    ID e devolve (registros inseridos/alterados, ids removidos).
+    """
+    finais = {}
+    for tipo, registro, antigo in mudancas:
+        if tipo == "DELETE":
+            if antigo and "id" in antigo:
+                finais[antigo["id"]] = None
+        elif registro and "id" in registro:
+            finais[registro["id"]] = registro
+    registros = [registro for registro in finais.values() if registro is not None]
+    removidos = [id_ for id_, registro in finais.items() if registro is None]
+    return registros, removidos
+
+class FeedMudancas:
+    """
+    Assina INSERT/UPDATE/DELETE de uma tabela e aplica as mudanças no sincronizador
+    (snapshot, versão e estruturas derivadas pelos ouvintes). Reconecta sozinho, e a
+    cada conexão pede uma sincronização para recuperar o que passou enquanto esteve fora.
+    """
+
+    def __init__(self, sincronizador, url, chave):
+        self.sincronizador = sincronizador
+        self.url = url
+        self.chave = chave
+        self.topico = f"realtime:{ESQUEMA}:{sincronizador.tabela}"
+        self.ultimo_erro = None
+        self._refs = itertools.count(1)
+        self._parar = threading.Event()
+        self._thread = None
+        self._conexao = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._laco, daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._conexao is not None:
+            self._conexao.close()
+
+    def _laco(self):
+        espera = 1
+        while not self._parar.is_set():
+            try:
+                self._sessao()
+                espera = 1
+            except Exception as e:
+                self.ultimo_erro = e
+            finally:
+                self.sincronizador.tempo_real = False
+            if self._parar.wait(espera):
+                break
+            espera = min(espera * 2, ESPERA_MAXIMA)
+
+    def _enviar(self, conexao, topico, evento, payload, join_ref=None):
+        ref = str(next(self._refs))
+        conexao.send(json.dumps({"topic": topico, "event": evento, "payload": payload, "ref": ref, "join_ref": join_ref}))
+        return ref
+
+    def _sessao(self):
+        from websockets.sync.client import connect
+
+        with connect(self.url, additional_headers=cabecalhos_realtime(self.chave), open_timeout=10) as conexao:
+            self._conexao = conexao
+            config = {"postgres_changes": [{"event": "*", "schema": ESQUEMA, "table": self.sincronizador.tabela}]}
+            ref_join = self._enviar(conexao, self.topico, "phx_join", {"config": config, "access_token": self.chave})
+            proximo_heartbeat = time.monotonic() + INTERVALO_HEARTBEAT
+            while not self._parar.is_set():
+                try:
+                    mensagem = json.loads(conexao.recv(timeout=max(0.0, proximo_heartbeat - time.monotonic())))
+                except TimeoutError:
+                    self._enviar(conexao, "phoenix", "heartbeat", {})
+                    proximo_heartbeat = time.monotonic() + INTERVALO_HEARTBEAT
+                    continue
+
+                evento, payload = mensagem.get("event"), mensagem.get("payload") or {}
+                if evento == "phx_reply" and mensagem.get("ref") == ref_join:
+                    if payload.get("status") != "ok":
+                        raise RuntimeError(f"Realtime recusou a assinatura de {self.sincronizador.tabela}: {payload.get('response')}")
+                    self.sincronizador.tempo_real = True
+                    # Recupera o que mudou enquanto o feed esteve desconectado
+                    self.sincronizador.atualizar_em_segundo_plano()
+                elif evento == "phx_reply" and mensagem.get("topic") == "phoenix":
+                    if self.sincronizador.tempo_real:
+                        self.sincronizador.marcar_em_dia()
+                elif self._encerrou(mensagem):
+                    raise RuntimeError(f"Canal do Realtime encerrado ({evento})")
+                elif evento == "postgres_changes":
+                    self._aplicar(conexao, [payload])
+
+    def _encerrou(self, mensagem):
+        """True se a mensagem avisa que o canal da tabela caiu (as mudanças pararam de chegar)"""
+        return mensagem.get("event") in ("phx_error", "phx_close") and mensagem.get("topic") == self.topico
+
+    def _aplicar(self, conexao, payloads):
+        # Junta as mudanças que já estão na fila, para trocar o snapshot uma vez só.
+        # Se o canal cair no meio, o que já chegou é aplicado e a falha sobe para
+        # _laco reconectar (e pedir a sincronização que recupera o resto)
+        encerrado = None
+        em_dia = False
+        while len(payloads) < TAMANHO_LOTE:
+            try:
+                mensagem = json.loads(conexao.recv(timeout=0.05))
+            except TimeoutError:
+                break
+            evento = mensagem.get("event")
+            if evento == "postgres_changes":
+                payloads.append(mensagem.get("payload") or {})
+            elif self._encerrou(mensagem):
+                encerrado = evento
+                break
+            elif evento == "phx_reply" and mensagem.get("topic") == "phoenix":
+                em_dia = True
+        mudancas = []
+        for payload in payloads:
+            dados = payload.get("data") or {}
+            mudancas.append((dados.get("type"), dados.get("record"), dados.get("old_record")))
+        registros, removidos = compactar_mudancas(mudancas)
+        self.sincronizador.aplicar_mudancas(registros, removidos)
+        if encerrado:
+            raise RuntimeError(f"Canal do Realtime encerrado ({encerrado})")
+        if em_dia and self.sincronizador.tempo_real:
+            self.sincronizador.marcar_em_dia()
+
+_feeds = {}
+_lock_feeds = threading.Lock()
+
+def iniciar_feed(sincronizador, url_supabase, chave):
+    """Inicia (uma vez por sincronizador) o feed de mudanças da tabela"""
+    # Sem chave a conexão seria recusada pelo gateway
+    if not ATIVO or not chave:
+        return None
+    with _lock_feeds:
+        chave_feed = id(sincronizador)
+        if chave_feed not in _feeds:
+            feed = FeedMudancas(sincronizador, url_realtime(url_supabase), chave)
+            feed.iniciar()
+            _feeds[chave_feed] = feed
+        return _feeds[chave_feed]
@@ -2,21 +2,89 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from services.supabase import carregar_chamados, carregar_chamados_fc
+from services.chamados import (
+    obter_chamados, agregados_dashboard, analises_tabela, relatorio_memoria, em_paralelo, aquecer_snapshots,
+    COLUNA_BUSCA,
+)
+from services.analises import FREQUENCIAS
+from services.cache import versao_tabela, CacheLRU
 from plotly.subplots import make_subplots
-import plotly.io as pio
 
-# Configuração de cache
-@st.cache_data(ttl=300)
-def carregar_dados_dashboard():
-    return carregar_chamados()
+TABELAS_DASHBOARD = ["Chamados", "Chamados_fc"]
 
-@st.cache_data(ttl=300)
-def carregar_dados_dashboard_facil():
-    return carregar_chamados_fc()
+def tabela_contagens(contagens, coluna):
+    """Converte {valor: quantidade} (contadores da tabela) no frame usado pelos gráficos"""
+    tabela = pd.DataFrame(list(contagens.items()), columns=[coluna, 'count'])
+    return tabela.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+def agregados_ou_erro(tabela):
+    """(contagens, erro) da tabela; roda nas threads de em_paralelo, o erro é mostrado depois"""
+    try:
+        return agregados_dashboard(tabela, versao_tabela(tabela)), None
+    except Exception as e:
+        return {'Status': {}, 'Pendência': {}, 'Usuário Resp': {}}, e
+
+def detalhar_chamados(tabela, contagens, chave):
+    """Lista os chamados de um status/responsável; só aqui a tabela completa é carregada"""
+    if not st.checkbox("🔎 Detalhar chamados", key=chave):
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        status = st.selectbox("Status", ["Todos"] + sorted(contagens['Status']), key=f"{chave}_status")
+    with col2:
+        usuario = st.selectbox("Responsável", ["Todos"] + sorted(contagens['Usuário Resp']), key=f"{chave}_usuario")
+    df = obter_chamados(tabela)
+    if df.empty:
+        return
+    if status != "Todos":
+        df = df[df['Status'] == status]
+    if usuario != "Todos":
+        df = df[df['Usuário Resp'] == usuario]
+    st.dataframe(df.drop(columns=COLUNA_BUSCA), hide_index=True, use_container_width=True)
+
+def secao_tendencias(tabela, chave):
+    """Aberturas por período, backlog e envelhecimento dos abertos; carrega a tabela completa"""
+    if not st.checkbox("📈 Tendências e envelhecimento", key=chave):
+        return
+    frequencia = st.radio("Agrupar por", list(FREQUENCIAS), index=1, horizontal=True, key=f"{chave}_frequencia")
+    analises = analises_tabela(tabela, frequencia)
+    if analises is None:
+        st.info("Nenhum chamado para analisar.")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(
+            figura(create_grouped_bar_chart, analises["aberturas"], 'Período', 'Chamados', 'Pendência', "Chamados abertos por período"),
+            use_container_width=True
+        )
+    with col2:
+        st.plotly_chart(
+            figura(create_line_chart, analises["backlog"], 'Período', 'Backlog', 'Pendência', "Backlog atual por data de abertura"),
+            use_container_width=True
+        )
+    st.caption("Sem data de conclusão na tabela, o backlog acumula os chamados que continuam abertos hoje.")
+    st.plotly_chart(
+        figura(create_grouped_bar_chart, analises["envelhecimento"], 'Faixa', 'Chamados', 'Pendência', "Chamados abertos por tempo desde a abertura"),
+        use_container_width=True
+    )
+
+# Figuras prontas (go.Figure) por gráfico, parâmetros e impressão digital dos
+# agregados. Fica fora do st.cache_data: não hasheia DataFrames a cada chamada,
+# não copia o resultado a cada acerto e não é descartado por st.cache_data.clear().
+# O objeto é compartilhado entre sessões: só é lido (st.plotly_chart não o altera).
+# Os agregados têm poucas linhas, então o limite em itens basta.
+_figuras = CacheLRU(max_itens=64)
+
+def impressao_digital(data):
+    """Chave barata dos agregados (poucas dezenas de linhas): colunas e linhas como tupla"""
+    return tuple(data.columns), tuple(data.itertuples(index=False, name=None))
+
+def figura(criar, data, *parametros):
+    """Figura de `criar(data, *parametros)`, montada uma vez por agregado"""
+    chave = (criar.__name__, impressao_digital(data), parametros)
+    return _figuras.obter(chave, lambda: criar(data, *parametros))
 
 # Funções para gráficos
-@st.cache_data
 def create_pie_chart(data, values_col, names_col, title=""):
     return px.pie(data, 
                 values=values_col, 
@@ -26,7 +94,6 @@ def create_pie_chart(data, values_col, names_col, title=""):
                 hole=0.3,
                 color_discrete_sequence=px.colors.sequential.Blues_r)
 
-@st.cache_data
 def create_bar_chart(data, x_col, y_col, title="", color_col=None, horizontal=False):
     if horizontal:
         fig = px.bar(data,
@@ -49,6 +116,25 @@ def create_bar_chart(data, x_col, y_col, title="", color_col=None, horizontal=Fa
                     color_continuous_scale=px.colors.sequential.Blues)
     return fig
 
+def create_grouped_bar_chart(data, x_col, y_col, color_col, title=""):
+    return px.bar(data,
+                x=x_col,
+                y=y_col,
+                color=color_col,
+                title=title,
+                barmode='group',
+                template='plotly_dark',
+                color_discrete_sequence=px.colors.sequential.Blues_r[1:])
+
+def create_line_chart(data, x_col, y_col, color_col, title=""):
+    return px.line(data,
+                x=x_col,
+                y=y_col,
+                color=color_col,
+                title=title,
+                template='plotly_dark',
+                color_discrete_sequence=px.colors.sequential.Blues_r[1:])
+
 # Função padronizada para o gráfico de usuários
 def create_user_chart(data, title=""):
     fig = px.bar(data,
@@ -95,83 +181,88 @@ def dashboard():
     </div>
     """, unsafe_allow_html=True)
 
-    # Carregamento de dados
+    # Agregados calculados no banco (algumas dezenas de linhas por tabela), as duas tabelas ao mesmo tempo
     with st.spinner('Carregando dados...'):
-        df = carregar_dados_dashboard()
-        df_facil = carregar_dados_dashboard_facil()
-
-        # Processamento de dados Pixeon
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            status_counts = df['Status'].value_counts().reset_index()
-            status_counts.columns = ['Status', 'count']
-            pendencia_counts = df['Pendência'].value_counts().reset_index()
-            pendencia_counts.columns = ['Pendência', 'count']
-            usuario_counts = df['Usuário Resp'].value_counts().reset_index()
-            usuario_counts.columns = ['Usuário', 'count']
-            usuario_counts = usuario_counts.sort_values('count', ascending=True)
-        else:
-            df = pd.DataFrame()
-            status_counts = pd.DataFrame(columns=['Status', 'count'])
-            pendencia_counts = pd.DataFrame(columns=['Pendência', 'count'])
-            usuario_counts = pd.DataFrame(columns=['Usuário', 'count'])
-
-        # Processamento de dados Fácil
-        if isinstance(df_facil, pd.DataFrame) and not df_facil.empty:
-            status_counts_fc = df_facil['Status'].value_counts().reset_index()
-            status_counts_fc.columns = ['Status', 'count']
-            pendencia_counts_fc = df_facil['Pendência'].value_counts().reset_index()
-            pendencia_counts_fc.columns = ['Pendência', 'count']
-            usuario_counts_fc = df_facil['Usuário Resp'].value_counts().reset_index()
-            usuario_counts_fc.columns = ['Usuário', 'count']
-            usuario_counts_fc = usuario_counts_fc.sort_values('count', ascending=True)
-        else:
-            df_facil = pd.DataFrame()
-            status_counts_fc = pd.DataFrame(columns=['Status', 'count'])
-            pendencia_counts_fc = pd.DataFrame(columns=['Pendência', 'count'])
-            usuario_counts_fc = pd.DataFrame(columns=['Usuário', 'count'])
+        agregados = em_paralelo(agregados_ou_erro, TABELAS_DASHBOARD)
+        for tabela, (contagens, erro) in agregados.items():
+            if erro is not None:
+                st.error(f"Erro ao carregar os chamados: {str(erro)}")
+            agregados[tabela] = contagens
+        contagens = agregados["Chamados"]
+        status_counts = tabela_contagens(contagens['Status'], 'Status')
+        pendencia_counts = tabela_contagens(contagens['Pendência'], 'Pendência')
+        usuario_counts = tabela_contagens(contagens['Usuário Resp'], 'Usuário')
+        usuario_counts = usuario_counts.sort_values('count', ascending=True)
+
+        contagens_fc = agregados["Chamados_fc"]
+        status_counts_fc = tabela_contagens(contagens_fc['Status'], 'Status')
+        pendencia_counts_fc = tabela_contagens(contagens_fc['Pendência'], 'Pendência')
+        usuario_counts_fc = tabela_contagens(contagens_fc['Usuário Resp'], 'Usuário')
+        usuario_counts_fc = usuario_counts_fc.sort_values('count', ascending=True)
 
     # Layout com abas
     tab1, tab2 = st.tabs(["Chamados Pixeon", "Chamados Fácil"])
 
     with tab1:
-        if not df.empty:
+        if not status_counts.empty:
             col1, col2 = st.columns(2)
             with col1:
                 st.plotly_chart(
-                    create_pie_chart(status_counts, 'count', 'Status', "Distribuição por Status"),
+                    figura(create_pie_chart, status_counts, 'count', 'Status', "Distribuição por Status"),
                     use_container_width=True
                 )
             with col2:
                 st.plotly_chart(
-                    create_bar_chart(pendencia_counts, 'Pendência', 'count', "Chamados por Pendência"),
+                    figura(create_bar_chart, pendencia_counts, 'Pendência', 'count', "Chamados por Pendência"),
                     use_container_width=True
                 )
             st.plotly_chart(
-            create_user_chart(usuario_counts, "Chamados por Usuário"),
+            figura(create_user_chart, usuario_counts, "Chamados por Usuário"),
             use_container_width=True
         )
+            detalhar_chamados("Chamados", contagens, "detalhe_chamados")
+            secao_tendencias("Chamados", "tendencias_chamados")
         else:
             st.warning("Nenhum dado disponível para Chamados Pixeon")
 
     with tab2:
-        if not df_facil.empty:
+        if not status_counts_fc.empty:
             col1, col2 = st.columns(2)
             with col1:
                 st.plotly_chart(
-                    create_pie_chart(status_counts_fc, 'count', 'Status', "Distribuição por Status"),
+                    figura(create_pie_chart, status_counts_fc, 'count', 'Status', "Distribuição por Status"),
                     use_container_width=True
                 )
             with col2:
                 st.plotly_chart(
-                    create_bar_chart(pendencia_counts_fc, 'Pendência', 'count', "Chamados por Pendência"),
+                    figura(create_bar_chart, pendencia_counts_fc, 'Pendência', 'count', "Chamados por Pendência"),
                     use_container_width=True
                 )
             st.plotly_chart(
-            create_user_chart(usuario_counts_fc, "Chamados por Usuário"),
+            figura(create_user_chart, usuario_counts_fc, "Chamados por Usuário"),
             use_container_width=True
         )
+            detalhar_chamados("Chamados_fc", contagens_fc, "detalhe_chamados_fc")
+            secao_tendencias("Chamados_fc", "tendencias_chamados_fc")
         else:
             st.warning("Nenhum dado disponível para Chamados Fácil")
 
+    with st.expander("💾 Uso de memória dos dados"):
+        if not st.checkbox("Carregar as tabelas completas para medir", key="medir_memoria"):
+            return
+        aquecer_snapshots(TABELAS_DASHBOARD)
+        for tabela, nome in [("Chamados", "Chamados Pixeon"), ("Chamados_fc", "Chamados Fácil")]:
+            st.write(f"**{nome}**")
+            st.dataframe(
+                relatorio_memoria(tabela),
+                column_config={
+                    "Antes": st.column_config.NumberColumn("Antes (bytes)", format="%d"),
+                    "Agora": st.column_config.NumberColumn("Agora (bytes)", format="%d"),
+                    "Economia": st.column_config.ProgressColumn("Economia", format="%.0f%%", min_value=0, max_value=1),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
 if __name__ == "__main__":
     dashboard()
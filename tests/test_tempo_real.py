@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import tempo_real
+from services.tempo_real import FeedMudancas
+
+
+class SincronizadorFalso:
+    """Só o que o feed usa do SincronizadorTabela"""
+
+    def __init__(self, tabela="Chamados"):
+        self.tabela = tabela
+        self.tempo_real = True
+        self.aplicados = []
+        self.em_dia = 0
+
+    def aplicar_mudancas(self, registros, ids_removidos):
+        self.aplicados.append((registros, ids_removidos))
+
+    def marcar_em_dia(self):
+        self.em_dia += 1
+
+    def atualizar_em_segundo_plano(self):
+        pass
+
+
+class ConexaoFalsa:
+    """Entrega as mensagens em ordem e depois fica sem nada na fila"""
+
+    def __init__(self, mensagens):
+        self.mensagens = [json.dumps(mensagem) for mensagem in mensagens]
+
+    def recv(self, timeout=None):
+        if not self.mensagens:
+            raise TimeoutError
+        return self.mensagens.pop(0)
+
+
+def mudanca(tipo, registro=None, antigo=None):
+    return {"topic": "realtime:public:Chamados", "event": "postgres_changes",
+            "payload": {"data": {"type": tipo, "record": registro, "old_record": antigo}}}
+
+
+class TestAplicar(unittest.TestCase):
+    def setUp(self):
+        self.sinc = SincronizadorFalso()
+        self.feed = FeedMudancas(self.sinc, "ws://local", "chave")
+
+    def test_lote_aplicado_de_uma_vez(self):
+        conexao = ConexaoFalsa([mudanca("UPDATE", {"id": 1, "titulo": "b"}), mudanca("DELETE", antigo={"id": 2})])
+        self.feed._aplicar(conexao, [mudanca("INSERT", {"id": 1, "titulo": "a"})["payload"]])
+        self.assertEqual(self.sinc.aplicados, [([{"id": 1, "titulo": "b"}], [2])])
+
+    def test_canal_encerrado_no_meio_do_lote(self):
+        for evento in ("phx_error", "phx_close"):
+            with self.subTest(evento=evento):
+                self.sinc.aplicados.clear()
+                conexao = ConexaoFalsa([
+                    mudanca("INSERT", {"id": 2}),
+                    {"topic": "realtime:public:Chamados", "event": evento, "payload": {}},
+                    mudanca("INSERT", {"id": 3}),
+                    {"topic": "phoenix", "event": "phx_reply", "payload": {"status": "ok"}},
+                ])
+                with self.assertRaises(RuntimeError):
+                    self.feed._aplicar(conexao, [mudanca("INSERT", {"id": 1})["payload"]])
+                # O que chegou antes da queda é aplicado; nada é dado como em dia
+                self.assertEqual(self.sinc.aplicados, [([{"id": 1}, {"id": 2}], [])])
+                self.assertEqual(self.sinc.em_dia, 0)
+
+    def test_erro_de_outro_topico_nao_encerra(self):
+        conexao = ConexaoFalsa([{"topic": "realtime:public:Chamados_fc", "event": "phx_error", "payload": {}}])
+        self.feed._aplicar(conexao, [mudanca("INSERT", {"id": 1})["payload"]])
+        self.assertEqual(self.sinc.aplicados, [([{"id": 1}], [])])
+
+    def test_heartbeat_no_meio_do_lote(self):
+        conexao = ConexaoFalsa([{"topic": "phoenix", "event": "phx_reply", "payload": {"status": "ok"}}])
+        self.feed._aplicar(conexao, [mudanca("INSERT", {"id": 1})["payload"]])
+        self.assertEqual(self.sinc.em_dia, 1)
+
+
+class TestSessaoLocal(unittest.TestCase):
+    """Sessão completa contra um servidor websocket local no lugar do Realtime"""
+
+    def test_phx_error_depois_das_mudancas_derruba_a_sessao(self):
+        from websockets.sync.server import serve
+
+        pedidos = []
+
+        def servidor(conexao):
+            pedidos.append(conexao.request)
+            join = json.loads(conexao.recv())
+            conexao.send(json.dumps({"topic": join["topic"], "event": "phx_reply", "ref": join["ref"],
+                                     "payload": {"status": "ok", "response": {}}}))
+            conexao.send(json.dumps(mudanca("INSERT", {"id": 1, "titulo": "a"})))
+            conexao.send(json.dumps(mudanca("UPDATE", {"id": 1, "titulo": "b"})))
+            conexao.send(json.dumps({"topic": join["topic"], "event": "phx_error", "payload": {}}))
+            conexao.recv()  # mantém a conexão aberta até o cliente sair
+
+        with serve(servidor, "127.0.0.1", 0) as servidor_ws:
+            threading.Thread(target=servidor_ws.serve_forever, daemon=True).start()
+            porta = servidor_ws.socket.getsockname()[1]
+            sinc = SincronizadorFalso()
+            sinc.tempo_real = False
+            feed = FeedMudancas(sinc, tempo_real.url_realtime(f"http://127.0.0.1:{porta}"), "chave")
+            with self.assertRaises(RuntimeError):
+                feed._sessao()
+            servidor_ws.shutdown()
+
+        self.assertEqual(sinc.aplicados, [([{"id": 1, "titulo": "b"}], [])])
+        # A chave vai nos cabeçalhos, nunca na URL
+        self.assertNotIn("chave", pedidos[0].path)
+        self.assertEqual(pedidos[0].headers["apikey"], "chave")
+
+
+if __name__ == "__main__":
+    unittest.main()